@@ -2,8 +2,8 @@ import os
 import sys
 from pathlib import Path
 
-import vtk
-from PyQt5.QtWidgets import QApplication
+# vtk and Qt are only imported by the interface, so the model and the
+# file handlers can be used by scripts without them.
 
 ROOT_DIR = Path(__file__).parent
 UI_DIR = ROOT_DIR / "interface/ui_files"
@@ -13,10 +13,22 @@ UI_DIR = ROOT_DIR / "interface/ui_files"
 
 
 def app() -> "Application":
+    from PyQt5.QtWidgets import QApplication
+
     return QApplication.instance()
 
 
 def run():
+    # Headless commands, like "opps convert", don't need the interface
+    from opps.cli import COMMANDS
+
+    if sys.argv[1:2] and sys.argv[1] in COMMANDS + ("-h", "--help"):
+        from opps.cli import main
+
+        sys.exit(main(sys.argv[1:]))
+
+    import vtk
+
     # disables the terrible vtk error handler and its logs
     # you may want to enable them while debugging something
     vtk.vtkObject.GlobalWarningDisplayOff()
@@ -0,0 +1,170 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+from pathlib import Path
+
+COMMANDS = ("convert", "validate")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="opps", description="Open Pulse Piping System")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = commands.add_parser(
+        "convert",
+        help="convert opps, pcf and step files",
+        description="Convert opps, pcf and step files in parallel.",
+    )
+    convert_parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="files, directories or glob patterns of the files to convert",
+    )
+    convert_parser.add_argument(
+        "-t",
+        "--to",
+        required=True,
+        choices=("opps", "pcf", "step"),
+        help="format of the converted files",
+    )
+    convert_parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="directory of the converted files, the same of each input by default",
+    )
+    convert_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes",
+    )
+
+    validate_parser = commands.add_parser(
+        "validate",
+        help="look for problems in opps, pcf and step files",
+        description="Look for problems in opps, pcf and step files in parallel.",
+    )
+    validate_parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="files, directories or glob patterns of the files to validate",
+    )
+    validate_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "convert":
+        return convert(args.inputs, args.to, args.output, args.jobs)
+    if args.command == "validate":
+        return validate(args.inputs, args.jobs)
+
+
+def convert(inputs, to, output=None, jobs=None):
+    from opps.io.conversion import convert_file
+
+    # Files already in the target format would be written onto themselves
+    sources = [source for source in find_files(inputs) if source.suffix.lower() != f".{to}"]
+    if not sources:
+        print("No files to convert.", file=sys.stderr)
+        return 1
+
+    tasks = dict()
+    destinations = dict()
+    for source in sources:
+        directory = source.parent if output is None else output
+        destination = directory / f"{source.stem}.{to}"
+        tasks[source] = (destination,)
+        destinations.setdefault(destination.resolve(), []).append(source)
+
+    clashes = [clashing for clashing in destinations.values() if len(clashing) > 1]
+    for clashing in clashes:
+        names = ", ".join(str(source) for source in clashing)
+        print(f"Files would be converted to the same destination: {names}", file=sys.stderr)
+    if clashes:
+        return 1
+
+    if output is not None:
+        output.mkdir(parents=True, exist_ok=True)
+
+    failures = 0
+    for source, (elapsed, error) in _run(convert_file, tasks, jobs):
+        if error is None:
+            print(f"ok     {elapsed:8.2f}s  {source} -> {tasks[source][0]}")
+        else:
+            failures += 1
+            print(f"failed {elapsed:8.2f}s  {source}: {error}")
+
+    print(f"{len(tasks) - failures} converted, {failures} failed.")
+    return 1 if failures else 0
+
+
+def validate(inputs, jobs=None):
+    from opps.io.conversion import validate_file
+
+    sources = find_files(inputs)
+    if not sources:
+        print("No files to validate.", file=sys.stderr)
+        return 1
+
+    failures = 0
+    for source, (elapsed, report, error) in _run(validate_file, dict.fromkeys(sources, ()), jobs):
+        if error is not None:
+            failures += 1
+            print(f"{source}: failed ({elapsed:.2f}s): {error}")
+            continue
+
+        errors = len(report.errors)
+        warnings = len(report.warnings)
+        print(f"{source}: {errors} errors, {warnings} warnings ({elapsed:.2f}s)")
+        for issue in report.issues:
+            tags = ", ".join(str(tag) for tag in issue.structures)
+            position = ", ".join(f"{value:.6g}" for value in issue.position or ())
+            print(f"    {issue.severity:7} {issue.check} [{tags}] ({position}) {issue.message}")
+        if errors:
+            failures += 1
+
+    return 1 if failures else 0
+
+
+def find_files(inputs):
+    from opps.io.conversion import SUPPORTED_FORMATS
+
+    files = dict()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = sorted(path.iterdir())
+        elif path.exists():
+            candidates = [path]
+        else:
+            candidates = sorted(Path(match) for match in glob(item, recursive=True))
+
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() in SUPPORTED_FORMATS:
+                files[candidate] = None
+
+    return list(files)
+
+
+def _run(function, tasks, jobs):
+    # Yields the results as soon as they are ready
+    if jobs is not None and jobs <= 1:
+        for source, args in tasks.items():
+            yield source, function(source, *args)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(function, source, *args): source for source, args in tasks.items()
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -1,8 +1,9 @@
-from PyQt5.QtCore import pyqtSignal
-from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QMessageBox
 
 from opps.interface.main_window import MainWindow
 from opps.interface.toolboxes import GeometryToolbox
+from opps.interface.toolboxes.geometry_toolbox import AUTOSAVE_PATH
 
 
 class Application(QApplication):
@@ -13,10 +14,29 @@ class Application(QApplication):
 
         self.geometry_toolbox = GeometryToolbox()
 
-
         self.main_window = MainWindow()
         self.main_window.show()
 
+        self._recover_session()
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.timeout.connect(self.geometry_toolbox.autosave)
+        self.autosave_timer.start(30_000)
+        # The autosave is only kept if the program crashes
+        self.aboutToQuit.connect(self.geometry_toolbox.remove_autosave)
+
     def update(self):
         self.geometry_toolbox.update()
         self.main_window.render_widget.update_plot(reset_camera=False)
+
+    def _recover_session(self):
+        if not AUTOSAVE_PATH.exists():
+            return
+
+        answer = QMessageBox.question(
+            self.main_window,
+            "Recover session",
+            "OPPS was not closed properly. Recover the unsaved changes?",
+        )
+        if answer == QMessageBox.Yes:
+            self.geometry_toolbox.recover_autosave()
+            self.main_window.render_widget.update_plot()
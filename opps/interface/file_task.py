@@ -0,0 +1,53 @@
+from threading import Event
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class FileTaskSignals(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class FileTask(QRunnable):
+    """
+    Runs a slow function, like opening or saving a file, in a
+    thread pool. The function receives a progress callback, that
+    raises TaskCancelled after the task is cancelled.
+
+    The signals are emitted from the worker thread, and Qt delivers
+    them in the thread of the connected objects, usually the interface.
+    """
+
+    def __init__(self, function, *args):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.signals = FileTaskSignals()
+        self._cancelled = Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def report_progress(self, fraction):
+        if self._cancelled.is_set():
+            raise TaskCancelled()
+        self.signals.progress.emit(int(100 * fraction))
+
+    def run(self):
+        try:
+            result = self.function(*self.args, progress=self.report_progress)
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except Exception as error:
+            self.signals.failed.emit(f"{type(error).__name__}: {error}")
+        else:
+            self.signals.finished.emit(result)
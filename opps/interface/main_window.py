@@ -1,14 +1,20 @@
+from pathlib import Path
+
 import qdarktheme
-from PyQt5.QtCore import QSize
+from PyQt5.QtCore import QSize, Qt, QThreadPool
+from PyQt5.QtGui import QKeySequence
 from PyQt5.QtWidgets import (
     QAction,
     QFileDialog,
     QMainWindow,
+    QMessageBox,
+    QProgressDialog,
     QVBoxLayout,
     QWidget,
 )
 
 from opps import app
+from opps.interface.file_task import FileTask
 from opps.interface.menus import ModeMenu, ProjectMenu
 from opps.interface.viewer_3d.render_widgets.editor_render_widget import (
     EditorRenderWidget,
@@ -22,12 +28,23 @@ class MainWindow(QMainWindow):
         QMainWindow.__init__(self, parent)
 
         self.floating_widget = None
+        self.file_task = None
 
         self.delete_action = QAction(self)
         self.delete_action.setShortcut("del")
         self.delete_action.triggered.connect(self.delete_selection_callback)
         self.addAction(self.delete_action)
 
+        self.undo_action = QAction(self)
+        self.undo_action.setShortcut(QKeySequence.Undo)
+        self.undo_action.triggered.connect(self.undo_callback)
+        self.addAction(self.undo_action)
+
+        self.redo_action = QAction(self)
+        self.redo_action.setShortcut(QKeySequence.Redo)
+        self.redo_action.triggered.connect(self.redo_callback)
+        self.addAction(self.redo_action)
+
 
         self._create_menu_bar()
         self._configure_window()
@@ -40,32 +57,88 @@ class MainWindow(QMainWindow):
         path, check = QFileDialog.getOpenFileName(
             self,
             "Select Geometry",
-            # filter="Piping Component File (*.pcf), Geometry Files (*.stp *.step *.iges)",
+            filter="OPPS Project (*.opps);;Piping Component File (*.pcf);;Geometry Files (*.stp *.step *.iges *.igs)",
         )
 
         if not check:
             return
 
-        app().geometry_toolbox.open(path)
-        self.render_widget.update_plot()
+        toolbox = app().geometry_toolbox
+        self._run_file_task("Opening", toolbox.load, path, self._open_finished)
 
     def save_dialog(self):
         if app().geometry_toolbox.save_path is None:
             self.save_as_dialog()
         else:
-            app().geometry_toolbox.save(app().geometry_toolbox.save_path)
+            toolbox = app().geometry_toolbox
+            self._run_file_task("Saving", toolbox.save, toolbox.save_path, self._save_finished)
 
     def save_as_dialog(self):
         path, check = QFileDialog.getSaveFileName(
             self,
             "Save As",
-            filter="Piping Component File (*.pcf), Geometry Files (*.stp *.step *.iges)",
+            filter="OPPS Project (*.opps);;Piping Component File (*.pcf);;Geometry Files (*.stp *.step *.iges)",
         )
 
         if not check:
             return
 
-        app().geometry_toolbox.save(path)
+        toolbox = app().geometry_toolbox
+        self._run_file_task("Saving", toolbox.save, path, self._save_finished)
+
+    def _open_finished(self, pipeline):
+        # The opened pipeline replaces the old one at once
+        app().geometry_toolbox.set_pipeline(pipeline)
+        self.render_widget.update_plot()
+
+    def _save_finished(self, path):
+        app().geometry_toolbox.save_path = path
+
+    def _run_file_task(self, title, function, path, callback=None):
+        """
+        Opens or saves files in a worker thread, so the window keeps
+        responding. The progress dialog is modal, so the pipeline can't
+        be edited while it is being saved.
+        """
+        if self.file_task is not None:
+            return
+
+        task = FileTask(function, path)
+        self.file_task = task
+
+        # The autosave would write the same pipeline at the same time
+        autosave_timer = app().autosave_timer
+        autosave_timer.stop()
+
+        dialog = QProgressDialog(f"{title} {Path(path).name}", "Cancel", 0, 100, self)
+        dialog.setWindowTitle(title)
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.canceled.connect(task.cancel)
+
+        def finish():
+            dialog.close()
+            self.file_task = None
+            autosave_timer.start()
+
+        def finished(result):
+            finish()
+            # Some steps can't be interrupted, so the
+            # cancellation may only be noticed after them.
+            if callback is not None and not task.is_cancelled():
+                callback(result)
+
+        def failed(message):
+            finish()
+            QMessageBox.critical(self, title, message)
+
+        task.signals.progress.connect(dialog.setValue)
+        task.signals.finished.connect(finished)
+        task.signals.failed.connect(failed)
+        task.signals.cancelled.connect(finish)
+        QThreadPool.globalInstance().start(task)
 
     def sizeHint(self) -> QSize:
         return QSize(800, 600)
@@ -118,6 +191,16 @@ class MainWindow(QMainWindow):
         editor.delete_selection()
         app().update()
 
+    def undo_callback(self):
+        editor = self.render_widget.editor
+        editor.undo()
+        app().update()
+
+    def redo_callback(self):
+        editor = self.render_widget.editor
+        editor.redo()
+        app().update()
+
     def selection_callback(self):
         if isinstance(self.floating_widget, AddStructuresWidget):
             if self.floating_widget.isVisible():
@@ -12,12 +12,14 @@ from opps.model import Pipeline
 from opps.model.pipeline_editor import PipelineEditor
 from opps.model.point import Point
 from opps.model.structure import Structure
-from opps.io.cad_file.step_handler import StepHandler
-from opps.io.pcf.pcf_handler import PCFHandler
-from opps.io.pcf.pcf_exporter import PCFExporter
+from opps.io.conversion import load_pipeline, save_pipeline
+from opps.io.neutral_file.journal import Journal
 from opps.interface import main_window
 
 
+AUTOSAVE_PATH = Path.home() / ".opps" / "autosave.opps"
+
+
 class GeometryToolbox(QObject):
     selection_changed = pyqtSignal()
 
@@ -31,54 +33,61 @@ class GeometryToolbox(QObject):
 
         self.pipeline = Pipeline()
         self.editor = PipelineEditor(self.pipeline)
+        self.journal = None
 
     def new(self):
-        self.pipeline.structures.clear()
-        self.update()
+        self.pipeline.clear()
+        self.editor.history.clear()
+        self.editor.update(full=True)
+        if self.journal is not None:
+            self.journal.compact()
 
     def open(self, path):
-        path = Path(path)
-        file_format = path.suffix.lower().strip()
-
-        if file_format == ".pcf":
-            self._open_pcf(path)
+        self.set_pipeline(self.load(path))
+
+    def load(self, path, progress=None) -> Pipeline:
+        """
+        Reads a file into a new pipeline. The current one is not touched,
+        so it is safe to call it outside of the interface thread.
+        """
+        return load_pipeline(path, progress)
+
+    def set_pipeline(self, pipeline):
+        # Opened files can't be undone
+        self.pipeline = pipeline
+        self.editor.set_pipeline(pipeline)
+
+    def autosave(self):
+        # Only the changes since the last autosave are written
+        if self.journal is None:
+            self.journal = Journal(AUTOSAVE_PATH, self.pipeline)
+            self.journal.watch(self.editor.history)
+        elif self.journal.pipeline is not self.pipeline:
+            self.journal.reset(self.pipeline)
         else:
-            self._open_cad(path)
-        
-        # self.editor.merge_coincident_points()
+            self.journal.flush()
 
-    def save(self, path):
-        path = Path(path)
-        self.save_path = path
-        file_format = path.suffix.lower().strip()
+    def remove_autosave(self):
+        if self.journal is not None:
+            self.journal.remove()
 
-        if file_format == ".pcf":
-            self._save_pcf(path)
-        else:
-            self._save_cad(path)
+    def recover_autosave(self):
+        self.set_pipeline(Journal.recover(AUTOSAVE_PATH))
 
-    def _open_cad(self, path):
-        StepHandler().open(path, self.editor)
-        self.update()
-
-    def _open_pcf(self, path):
-        self.pcf_handler = PCFHandler()
-        self.pcf_handler.load(path,self.pipeline)
-        self.update()
-
-    def _save_cad(self, path):
-        step_handler = StepHandler()
-        step_handler.save(path, self.editor)
-
-    def _save_pcf(self, path):
-        self.pcf_exporter = PCFExporter()
-        self.pcf_exporter.save(path,self.pipeline)
+    def save(self, path, progress=None):
+        """
+        Writes the pipeline and returns where. The save path is only
+        changed by the interface after the file is completely written.
+        """
+        path = Path(path)
+        save_pipeline(self.pipeline, path, progress)
+        return path
 
-    def get_point(self, point_index) -> Point:
-        return self.pipeline.points[point_index]
+    def get_point(self, point_row) -> Point:
+        return self.pipeline.get_point(point_row)
 
-    def get_structure(self, structure_index) -> Structure:
-        return self.pipeline.structures[structure_index]
+    def get_structure(self, structure_tag) -> Structure:
+        return self.pipeline.get_structure(structure_tag)
 
     def get_selected_points(self) -> Generator[Point, None, None]:
         return self.selected_points
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+
+import numpy as np
+import vtk
+
+from opps.model.bend import Bend
+from opps.model.flange import Flange
+
+
+def geometry_signature(structure) -> tuple:
+    """
+    Everything that changes the shape of a structure, but not its color.
+    """
+    coords = tuple(value for point in structure.get_points() for value in point)
+    signature = (type(structure), coords, tuple(structure.get_diameters()))
+
+    if isinstance(structure, Bend):
+        signature += (structure.curvature,)
+    if isinstance(structure, Flange):
+        signature += (tuple(np.asarray(structure.normal, dtype=float).tolist()),)
+    return signature
+
+
+class GeometryCache:
+    """
+    Tessellated polydata of the structures, with normals, keyed by their
+    geometric signature. So redrawing a pipeline only builds the tubes of
+    the structures that changed since the last time.
+
+    The least recently used entries are evicted when the polydata take
+    more than max_bytes. Cached polydata are shared, so they must be
+    shallow copied before getting colors or other arrays.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, structure) -> vtk.vtkPolyData:
+        key = geometry_signature(structure)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry[0]
+
+        data = self._tessellate(structure)
+        size = data.GetActualMemorySize() * 1024
+        self._entries[key] = (data, size)
+        self.used_bytes += size
+        self._evict()
+        return data
+
+    def clear(self):
+        self._entries.clear()
+        self.used_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self):
+        # The newest entry is kept even if it alone is over the budget
+        while self.used_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.used_bytes -= size
+
+    def _tessellate(self, structure):
+        normals_filter = vtk.vtkPolyDataNormals()
+        normals_filter.AddInputData(structure.as_vtk().GetMapper().GetInput())
+        normals_filter.Update()
+        return normals_filter.GetOutput()
+
+
+default_geometry_cache = GeometryCache()
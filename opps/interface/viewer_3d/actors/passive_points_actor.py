@@ -3,14 +3,13 @@ from vtkat.poly_data import VerticesData
 
 
 class PassivePointsActor(vtk.vtkActor):
-    def __init__(self, points):
+    def __init__(self, coords):
         super().__init__()
-        self.points = points
+        self.coords = coords
         self.build()
     
     def build(self):
-        coords = [p.coords() for p in self.points]
-        data = VerticesData(coords)
+        data = VerticesData(self.coords)
         mapper = vtk.vtkPolyDataMapper()
         mapper.SetInputData(data)
         self.SetMapper(mapper)
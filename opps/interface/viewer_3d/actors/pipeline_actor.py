@@ -1,17 +1,19 @@
 import vtk
 
-from opps.interface.viewer_3d.actors.pipe_actor import PipeActor
-from opps.model.pipe import Pipe
+from opps.interface.viewer_3d.actors.geometry_cache import GeometryCache, default_geometry_cache
 from opps.model.pipeline import Pipeline
 
 from .utils import fill_cell_identifier, paint_data
 
 
 class PipelineActor(vtk.vtkActor):
-    def __init__(self, pipeline: Pipeline):
+    def __init__(self, pipeline: Pipeline, geometry_cache: GeometryCache = None):
         super().__init__()
 
         self.pipeline = pipeline
+        self.geometry_cache = geometry_cache
+        if geometry_cache is None:
+            self.geometry_cache = default_geometry_cache
         self.create_geometry()
         self.configure_appearance()
 
@@ -19,24 +21,22 @@ class PipelineActor(vtk.vtkActor):
         append_filter = vtk.vtkAppendPolyData()
         selection_color = (247, 0, 20)
 
-        for i, shape in enumerate(self.pipeline.structures):
-            shape_data = shape.as_vtk().GetMapper().GetInput()
+        for shape in self.pipeline.structures:
+            # Only the structures that changed are tessellated again,
+            # the colors and identifiers go in a copy of the cached data.
+            shape_data = vtk.vtkPolyData()
+            shape_data.ShallowCopy(self.geometry_cache.get(shape))
 
-            if shape.staged:
+            if shape.staged or shape.selected:
                 paint_data(shape_data, selection_color)
+            else:
+                paint_data(shape_data, shape.color)
 
-            if shape.selected:
-                paint_data(shape_data, selection_color)
-
-            fill_cell_identifier(shape_data, i)
+            fill_cell_identifier(shape_data, shape.tag)
             append_filter.AddInputData(shape_data)
         append_filter.Update()
 
-        normals_filter = vtk.vtkPolyDataNormals()
-        normals_filter.AddInputData(append_filter.GetOutput())
-        normals_filter.Update()
-
-        data = normals_filter.GetOutput()
+        data = append_filter.GetOutput()
 
         mapper = vtk.vtkPolyDataMapper()
         mapper.SetInputData(data)
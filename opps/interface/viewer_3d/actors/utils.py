@@ -15,7 +15,7 @@ def paint_data(data: vtk.vtkPolyData, color: tuple):
 
 def fill_cell_identifier(data: vtk.vtkPolyData, identifier: int):
     n_cells = data.GetNumberOfCells()
-    cell_identifier = vtk.vtkUnsignedCharArray()
+    cell_identifier = vtk.vtkIntArray()
     cell_identifier.SetName("cell_identifier")
     cell_identifier.SetNumberOfTuples(n_cells)
     cell_identifier.Fill(identifier)
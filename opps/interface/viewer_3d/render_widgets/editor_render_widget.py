@@ -31,6 +31,8 @@ class EditorRenderWidget(CommonRenderWidget):
         self.control_points_actor = None
         self.passive_points_actor = None
         self.selected_points_actor = None
+        self.control_point_rows = np.array([], dtype=int)
+        self.passive_point_rows = np.array([], dtype=int)
         self.coords = np.array([0, 0, 0])
 
         self.renderer.GetActiveCamera().SetParallelProjection(True)
@@ -41,10 +43,15 @@ class EditorRenderWidget(CommonRenderWidget):
         self.remove_actors()
 
         pipeline = self.editor.pipeline
+        coords = pipeline.coordinates.data
+
+        # Keep the rows of the rendered points to know what was picked
+        self.control_point_rows = pipeline.control_point_rows()
+        self.passive_point_rows = pipeline.point_rows()
 
         self.pipeline_actor = pipeline.as_vtk()
-        self.control_points_actor = ControlPointsActor(pipeline.control_points)
-        self.passive_points_actor = PassivePointsActor(pipeline.points)
+        self.control_points_actor = ControlPointsActor(coords[self.control_point_rows])
+        self.passive_points_actor = PassivePointsActor(coords[self.passive_point_rows])
         self.selected_points_actor = SelectedPointsActor(self.editor.selected_points)
 
         # The order matters. It defines wich points will appear first.
@@ -60,7 +67,7 @@ class EditorRenderWidget(CommonRenderWidget):
     def change_anchor(self, point):
         self.editor.dismiss()
         self.editor.set_anchor(point)
-        self.coords = point.coords()
+        self.coords = point.coords().copy()
         self.update_plot(reset_camera=False)
 
     def stage_pipe_deltas(self, dx, dy, dz, radius=0.3):
@@ -85,7 +92,7 @@ class EditorRenderWidget(CommonRenderWidget):
         self.update()
 
     def commit_structure(self):
-        self.coords = self.editor.anchor.coords()
+        self.coords = self.editor.anchor.coords().copy()
         self.editor.commit()
         self.update_plot()
 
@@ -143,19 +150,20 @@ class EditorRenderWidget(CommonRenderWidget):
 
         picked = self._pick_actor(x, y, self.control_points_actor)
         indexes = picked.get(self.control_points_actor, [])
-        control_points = [pipeline.control_points[i] for i in  indexes]
+        control_points = [pipeline.get_point(self.control_point_rows[i]) for i in indexes]
 
         picked = self._pick_actor(x, y, self.passive_points_actor)
         indexes = picked.get(self.passive_points_actor, [])
-        passive_points = [pipeline.points[i] for i in  indexes]
+        passive_points = [pipeline.get_point(self.passive_point_rows[i]) for i in indexes]
         
         combined_points = set(control_points + passive_points)
         return list(combined_points)
 
     def _pick_structures(self, x, y):
         pipeline = self.editor.pipeline
-        indexes = self._pick_property(x, y, "cell_identifier", self.pipeline_actor)
-        return [pipeline.structures[i] for i in indexes]
+        tags = self._pick_property(x, y, "cell_identifier", self.pipeline_actor)
+        structures = [pipeline.get_structure(tag) for tag in tags]
+        return [structure for structure in structures if structure is not None]
 
     def _pick_actor(self, x, y, actor_to_select):
         selection_picker = CellAreaPicker()
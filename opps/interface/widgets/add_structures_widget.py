@@ -126,7 +126,7 @@ class AddStructuresWidget(QWidget):
             return
 
         *_, last_point = points
-        enable = last_point in app().geometry_toolbox.pipeline.control_points
+        enable = app().geometry_toolbox.pipeline.is_control_point(last_point)
         self.dx_box.setEnabled(enable)
         self.dy_box.setEnabled(enable)
         self.dz_box.setEnabled(enable)
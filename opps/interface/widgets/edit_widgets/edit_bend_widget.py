@@ -64,7 +64,7 @@ class EditBendWidget(QWidget):
         except ValueError:
             return
         else:
-            structure.curvature = curvature
+            editor.set_attribute(structure, "curvature", curvature)
             app().update()
 
     def moph_list_callback(self):
@@ -44,7 +44,7 @@ class EditPointWidget(QWidget):
         self.dy_box.setText(str(round(last_point.y, 3)))
         self.dz_box.setText(str(round(last_point.z, 3)))
 
-        enable = last_point in app().geometry_toolbox.pipeline.control_points
+        enable = app().geometry_toolbox.pipeline.is_control_point(last_point)
         self.dx_box.setEnabled(enable)
         self.dy_box.setEnabled(enable)
         self.dz_box.setEnabled(enable)
@@ -97,7 +97,7 @@ class EditPointWidget(QWidget):
         except ValueError:
             return
 
-        last_point.set_coords(x, y, z)
+        editor.set_point_coords(last_point, (x, y, z))
         app().update()
 
     def flange_callback(self):
@@ -1,5 +1,6 @@
 import gmsh
 
+from opps.io.cad_file.gmsh_session import gmsh_model
 from opps.model.bend import Bend
 from opps.model.flange import Flange
 from opps.model.pipe import Pipe
@@ -7,14 +8,31 @@ from opps.model.pipe import Pipe
 
 class CADHandler:
     def save(self, path, pipeline):
-        gmsh.initialize("", False)
-        for i, structure in enumerate(pipeline.structures, 1):
+        with gmsh_model():
+            self.add_entities(pipeline)
+            gmsh.model.occ.synchronize()
+            gmsh.write(str(path))
+
+    def add_entities(self, pipeline):
+        # Structures that meet at a point share the same occ vertex, so the
+        # file stays small and the lines and arcs are connected.
+        point_tags = dict()
+
+        def add_point(point):
+            tag = point_tags.get(point)
+            if tag is None:
+                tag = point_tags[point] = gmsh.model.occ.add_point(*point)
+            return tag
+
+        for structure in pipeline.structures:
             # The tag of the structures isn't really a thing after the
             # file is saved, but at least it preserves the desired ordering.
+            # Gmsh tags start at 1.
+            i = structure.tag + 1
 
             if isinstance(structure, Pipe):
-                start_point = gmsh.model.occ.add_point(*structure.start.coords())
-                end_point = gmsh.model.occ.add_point(*structure.end.coords())
+                start_point = add_point(structure.start)
+                end_point = add_point(structure.end)
 
                 gmsh.model.occ.add_line(start_point, end_point, tag=i)
 
@@ -22,11 +40,8 @@ class CADHandler:
                 if structure.is_colapsed():
                     continue
 
-                start_point = gmsh.model.occ.add_point(*structure.start.coords())
-                end_point = gmsh.model.occ.add_point(*structure.end.coords())
-                center_point = gmsh.model.occ.add_point(*structure.center.coords())
+                start_point = add_point(structure.start)
+                end_point = add_point(structure.end)
+                center_point = add_point(structure.center)
 
                 gmsh.model.occ.add_circle_arc(start_point, center_point, end_point, tag=i)
-
-        gmsh.model.occ.synchronize()
-        gmsh.write(str(path))
@@ -0,0 +1,52 @@
+import atexit
+from contextlib import contextmanager
+from itertools import count
+from threading import RLock
+
+import gmsh
+
+# gmsh is initialized once for the whole process, and every
+# operation works on a model of its own that is removed after it.
+_lock = RLock()
+_model_names = count()
+
+
+def initialize(verbosity=0, threads=0):
+    """
+    Initializes gmsh if it is not already. A number of
+    threads of 0 lets gmsh use its default.
+    """
+    with _lock:
+        if gmsh.isInitialized():
+            return
+
+        # Not interruptible, because the signal handler
+        # can't be set from the worker threads of the interface.
+        gmsh.initialize("", False, interruptible=False)
+        gmsh.option.setNumber("General.Verbosity", verbosity)
+        gmsh.option.setNumber("General.NumThreads", threads)
+        atexit.register(finalize)
+
+
+def finalize():
+    with _lock:
+        if gmsh.isInitialized():
+            gmsh.finalize()
+
+
+@contextmanager
+def gmsh_model():
+    """
+    Gives an empty model that is the current one while the block runs.
+    gmsh has a single current model and isn't thread safe, so other
+    threads wait until the block is over.
+    """
+    with _lock:
+        initialize()
+        name = f"opps_{next(_model_names)}"
+        gmsh.model.add(name)
+        try:
+            yield gmsh.model
+        finally:
+            gmsh.model.setCurrent(name)
+            gmsh.model.remove()
@@ -1,10 +1,12 @@
 import gmsh
-import math
 import numpy as np
+from opps.io.cad_file.cad_handler import CADHandler
+from opps.io.cad_file.gmsh_session import gmsh_model
 from opps.model.pipe import Pipe
 from opps.model.bend import Bend
 from opps.model import Point
 from opps.model.pipeline_editor import PipelineEditor
+from opps.model.spatial_hash import find_coincident_points
 
 
 class StepHandler:
@@ -12,98 +14,111 @@ class StepHandler:
         pass
 
     def save(self, path, editor):
-        gmsh.initialize("", False)
-        for structure in editor.pipeline.structures: 
-
-            if isinstance(structure, Pipe):
-                start_point = gmsh.model.occ.add_point(*structure.start.coords())
-                end_point = gmsh.model.occ.add_point(*structure.end.coords())
-
-                gmsh.model.occ.add_line(start_point, end_point)
-
-            elif isinstance(structure, Bend):
-                if (structure.start.coords() == structure.end.coords()).all():
-                    continue
-                start_point = gmsh.model.occ.add_point(*structure.start.coords())
-                end_point = gmsh.model.occ.add_point(*structure.end.coords())
-                center_point = gmsh.model.occ.add_point(*structure.center.coords())
-
-                gmsh.model.occ.add_circle_arc(start_point, center_point, end_point)
-
-        gmsh.model.occ.synchronize()
-        gmsh.write(str(path))
+        CADHandler().save(path, editor.pipeline)
 
     def normalize(vector):
         return vector / np.linalg.norm(vector)
 
     
     def open(self, path, editor):
-        gmsh.initialize("", False)
-        gmsh.option.setNumber("General.Verbosity", 0)
-        gmsh.open(str(path))
-
-        structures = [] 
-        points = gmsh.model.get_entities(0)
-        lines = gmsh.model.get_entities(1)
-        
-        points_coords = []
-        for point in points: 
-            coords = gmsh.model.getValue(*point, [])
-            points_coords.append((point[1], (coords)))
-
-        associated_points = []
-        for line in lines:
-            associated_points.append(gmsh.model.get_adjacencies(*line)[1][0])
-            associated_points.append(gmsh.model.get_adjacencies(*line)[1][1])
-
-        center_points = []
-        for point in points:
-            if point[1] not in associated_points:
-                center_points.append(point[1])
-
-        for line in lines: 
-            start_point = gmsh.model.get_adjacencies(*line)[1][0]
-            end_point = gmsh.model.get_adjacencies(*line)[1][1]
-            line_type = gmsh.model.get_type(*line)
-
-            start_coords = (points_coords[start_point -1][1])
-            end_coords = (points_coords[end_point -1][1])
-
-            start = Point(*start_coords)
-            end = Point(*end_coords)
-
-            if line_type == 'Line':
-                pipe = Pipe(start, end)
-
-            elif line_type == 'Circle':
-                for point in center_points:
-                    start_radius = math.dist(start_coords, points_coords[point-1][1]) # the second argument is the coords of the tested center point
-                    end_radius = math.dist(end_coords, points_coords[point-1][1])
-                    
-                    if abs(start_radius - end_radius) <= 1e-10:
-                        start_radius_center = start_radius
-                        end_radius_center = end_radius
-                        center_point = point
-
-                center_coords = np.array(points_coords[center_point - 1][1])
-                start_coords = np.array(start_coords)
-                end_coords = np.array(end_coords)
-
-                a_vector = start_coords - center_coords
-                b_vector = end_coords - center_coords
-                a_vector_normalized = a_vector / np.linalg.norm(a_vector)
-                b_vector_normalized = b_vector / np.linalg.norm(b_vector)
-                c_vector = a_vector_normalized + b_vector_normalized
-                c_vector_normalized = c_vector / np.linalg.norm(c_vector)
-
-                radius = (start_radius_center + end_radius_center) / 2
-                corner_distance = (radius**2)*np.sqrt(2 / (np.dot(a_vector, b_vector) + radius**2))
-                corner_coords = center_coords + c_vector_normalized * corner_distance
-
-                corner = Point(*corner_coords)
-                pipe = Bend(start, end, corner, radius)
-
-            structures.append(pipe)
+        with gmsh_model():
+            gmsh.merge(str(path))
+
+            # Everything is fetched from gmsh a single time and kept in arrays
+            point_tags = [tag for _, tag in gmsh.model.get_entities(0)]
+            line_tags = [tag for _, tag in gmsh.model.get_entities(1)]
+            line_types = [gmsh.model.get_type(1, tag) for tag in line_tags]
+
+            # Tags don't need to be dense, so they are translated to rows
+            point_rows = np.full(max(point_tags, default=0) + 1, -1)
+            point_rows[point_tags] = np.arange(len(point_tags))
+            points_coords = np.array(
+                [gmsh.model.getValue(0, tag, []) for tag in point_tags], dtype=float
+            ).reshape(-1, 3)
+
+            end_tags = self._line_ends(line_tags)
+            start_coords = points_coords[point_rows[end_tags[:, 0]]]
+            end_coords = points_coords[point_rows[end_tags[:, 1]]]
+
+            is_pipe = np.array([kind == "Line" for kind in line_types], dtype=bool)
+            is_bend = np.array([kind == "Circle" for kind in line_types], dtype=bool)
+
+            # The points that don't bound any line are the centers of the arcs
+            is_center = np.ones(len(point_tags), dtype=bool)
+            is_center[point_rows[end_tags.ravel()]] = False
+            arc_tags = [tag for tag, bend in zip(line_tags, is_bend) if bend]
+            centers = self._arc_centers(arc_tags, points_coords[is_center])
+
+        a_vectors = start_coords[is_bend] - centers
+        b_vectors = end_coords[is_bend] - centers
+        a_radii = np.linalg.norm(a_vectors, axis=1)
+        b_radii = np.linalg.norm(b_vectors, axis=1)
+        radii = (a_radii + b_radii) / 2
+
+        c_vectors = a_vectors / a_radii[:, None] + b_vectors / b_radii[:, None]
+        c_vectors /= np.linalg.norm(c_vectors, axis=1)[:, None]
+        dots = np.sum(a_vectors * b_vectors, axis=1)
+        corner_distances = (radii**2) * np.sqrt(2 / (dots + radii**2))
+        corners_coords = centers + c_vectors * corner_distances[:, None]
+
+        coords = np.concatenate((start_coords, end_coords, corners_coords))
+        store = editor.pipeline.coordinates
+        rows = store.allocate_many(coords)
+        points = [Point.from_index(store, row) for row in rows.tolist()]
+        starts = points[: len(line_tags)]
+        ends = points[len(line_tags) : 2 * len(line_tags)]
+        corners = iter(points[2 * len(line_tags) :])
+        radii = iter(radii.tolist())
+
+        structures = []
+        for start, end, pipe, bend in zip(starts, ends, is_pipe.tolist(), is_bend.tolist()):
+            if pipe:
+                structures.append(Pipe(start, end))
+            elif bend:
+                structures.append(Bend(start, end, next(corners), next(radii)))
 
         editor.pipeline.structures = structures
         editor.merge_coincident_points()
+
+    def _line_ends(self, line_tags):
+        """
+        Tags of the start and end points of every line.
+        """
+        dim_tags = [(1, tag) for tag in line_tags]
+        boundary = gmsh.model.get_boundary(dim_tags, combined=False, oriented=False)
+        if len(boundary) == 2 * len(line_tags):
+            return np.array([tag for _, tag in boundary], dtype=int).reshape(-1, 2)
+
+        # Some line is closed, so every one of them needs to be checked
+        ends = [gmsh.model.get_adjacencies(1, tag)[1] for tag in line_tags]
+        return np.array([(line[0], line[-1]) for line in ends], dtype=int).reshape(-1, 2)
+
+    def _arc_centers(self, arc_tags, center_points, tolerance=1e-6):
+        """
+        Centers of the arcs, from the circle through the start, the middle
+        and the end of each one, as evaluated by gmsh. When the file has a
+        center point at the same place, its coordinates are used instead.
+        """
+        samples = []
+        for tag in arc_tags:
+            lower, upper = gmsh.model.getParametrizationBounds(1, tag)
+            parameters = [lower[0], (lower[0] + upper[0]) / 2, upper[0]]
+            samples.append(gmsh.model.getValue(1, tag, parameters))
+        samples = np.array(samples, dtype=float).reshape(-1, 3, 3)
+
+        # circumcenters of the triangles formed by the samples
+        a = samples[:, 0] - samples[:, 1]
+        b = samples[:, 2] - samples[:, 1]
+        normals = np.cross(a, b)
+        numerators = np.cross(
+            np.sum(a * a, axis=1)[:, None] * b - np.sum(b * b, axis=1)[:, None] * a,
+            normals,
+        )
+        denominators = 2 * np.sum(normals * normals, axis=1)[:, None]
+        centers = samples[:, 1] + numerators / denominators
+
+        # Each group is labeled by its smallest index, that is
+        # a center point of the file if there is one in the group.
+        coords = np.concatenate((center_points, centers))
+        labels = find_coincident_points(coords, tolerance)[len(center_points) :]
+        return coords[labels]
@@ -0,0 +1,96 @@
+import os
+from pathlib import Path
+from time import perf_counter
+
+from opps.io.opps_file.opps_handler import OPPSHandler
+from opps.io.pcf.pcf_exporter import PCFExporter
+from opps.io.pcf.pcf_handler import PCFHandler
+from opps.model import Pipeline
+from opps.model.pipeline_editor import PipelineEditor
+
+OPPS_FORMATS = (".opps",)
+PCF_FORMATS = (".pcf",)
+CAD_FORMATS = (".step", ".stp", ".iges", ".igs")
+SUPPORTED_FORMATS = OPPS_FORMATS + PCF_FORMATS + CAD_FORMATS
+
+
+def load_pipeline(path, progress=None) -> Pipeline:
+    """
+    Reads a file into a new pipeline. Some formats call progress with
+    the fraction that is done, and it can raise to stop the loading.
+    """
+    path = Path(path)
+    file_format = path.suffix.lower()
+
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+
+    if file_format in OPPS_FORMATS:
+        # The saved geometry is already solved
+        OPPSHandler().load(path, pipeline)
+        return pipeline
+    elif file_format in PCF_FORMATS:
+        PCFHandler().load(path, pipeline, progress)
+    elif file_format in CAD_FORMATS:
+        from opps.io.cad_file.step_handler import StepHandler
+
+        StepHandler().open(path, editor)
+    else:
+        raise ValueError(f'Unsupported file format "{path.suffix}".')
+
+    editor.update(full=True)
+    return pipeline
+
+
+def save_pipeline(pipeline, path, progress=None):
+    """
+    Writes the pipeline to a file. It is written to a temporary file
+    first, so a failed or cancelled save doesn't damage the old one.
+    """
+    path = Path(path)
+    file_format = path.suffix.lower()
+    partial_path = path.with_name(f"{path.stem}.partial{file_format}")
+
+    try:
+        if file_format in OPPS_FORMATS:
+            OPPSHandler().save(partial_path, pipeline)
+        elif file_format in PCF_FORMATS:
+            PCFExporter().save(partial_path, pipeline, progress)
+        elif file_format in CAD_FORMATS:
+            from opps.io.cad_file.step_handler import StepHandler
+
+            StepHandler().save(partial_path, PipelineEditor(pipeline))
+        else:
+            raise ValueError(f'Unsupported file format "{path.suffix}".')
+        os.replace(partial_path, path)
+
+    finally:
+        partial_path.unlink(missing_ok=True)
+
+
+def convert_file(source, destination):
+    """
+    Converts a single file, returning the time it took and the error
+    message if it failed. Errors are not raised so many files can be
+    converted in worker processes without stopping at the first one.
+    """
+    start = perf_counter()
+    try:
+        pipeline = load_pipeline(source)
+        save_pipeline(pipeline, destination)
+    except Exception as error:
+        return perf_counter() - start, f"{type(error).__name__}: {error}"
+    return perf_counter() - start, None
+
+
+def validate_file(source):
+    """
+    Loads and validates a single file, returning the time it took, the
+    report and the error message if it could not be loaded.
+    """
+    start = perf_counter()
+    try:
+        report = load_pipeline(source).validate()
+    except Exception as error:
+        return perf_counter() - start, None, f"{type(error).__name__}: {error}"
+    return perf_counter() - start, report, None
@@ -0,0 +1,245 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from opps.io.opps_file.opps_handler import OPPSHandler
+from opps.model import Bend, Elbow, Flange, Pipe, Pipeline, Point
+
+# Kinds of structures, by the name used in the records
+_KINDS = dict(elbow=Elbow, bend=Bend, flange=Flange, pipe=Pipe)
+
+
+class Journal:
+    """
+    Crash safe autosave made of a snapshot and an append only journal.
+
+    The snapshot is a .opps file, and the journal, saved next to it, gets
+    a json line for every change made after it:
+        ["p", id, x, y, z]  a point was created or moved
+        ["s", tag, order, kind, point ids, ...]  a structure was added or changed
+        ["r", tag]  a structure was removed
+        ["c"]  end of the changes of a flush
+
+    Points are known by ids, that are their positions in the snapshot or
+    the ones given when they are first written. The changed structures
+    come from the edit history, and the moved points from the versions
+    of the coordinate store, so a flush costs as much as the change.
+    When the journal gets bigger than the snapshot they are compacted.
+    """
+
+    def __init__(self, path, pipeline: Pipeline, minimum_compaction=2**20):
+        self.path = Path(path)
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+        self.minimum_compaction = minimum_compaction
+
+        self.pipeline = pipeline
+        self._point_ids: dict[Point, int] = dict()
+        self._next_point_id = 0
+        self._versions = np.zeros(0, dtype=np.int64)
+        self._changed_structures = dict()
+        self._history = None
+        self._file = None
+
+        self.compact()
+
+    def watch(self, history):
+        """
+        Keep track of the structures changed by the groups of commands
+        that are committed, undone or redone in the history, and by the
+        group that is open at each flush.
+        """
+        self._history = history
+        history.add_listener(self._group_changed)
+
+    def flush(self):
+        records = []
+
+        # Points moved by the edition or by the solver
+        rows = self.pipeline.point_rows()
+        versions = self.pipeline.coordinates.versions
+        known = rows < len(self._versions)
+        moved = rows[known][versions[rows[known]] != self._versions[rows[known]]]
+        for row in moved.tolist():
+            point = self.pipeline.get_point(row)
+            if point in self._point_ids:
+                records.append(self._point_record(point))
+        self._versions = versions.copy()
+
+        # Edits of the group that is still open, like the ones
+        # of the edit widgets, that only close it much later.
+        if self._history is not None:
+            self._changed_structures.update(dict.fromkeys(self._history.pending_structures()))
+
+        changed = list(self._changed_structures)
+        self._changed_structures.clear()
+
+        for structure in changed:
+            if self.pipeline.get_structure(structure.tag) is not structure:
+                records.append(["r", structure.tag])
+
+        for structure in changed:
+            if self.pipeline.get_structure(structure.tag) is structure:
+                # new points are written before the structures that use them
+                for point in structure.get_points():
+                    if point not in self._point_ids:
+                        records.append(self._point_record(point))
+                records.append(self._structure_record(structure))
+
+        if not records:
+            return
+
+        records.append(["c"])
+        self._file.writelines(json.dumps(record) + "\n" for record in records)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self._forget_removed_points()
+        if self._file.tell() > max(self.path.stat().st_size, self.minimum_compaction):
+            self.compact()
+
+    def reset(self, pipeline: Pipeline):
+        """
+        Start over with another pipeline, like one that was just opened.
+        """
+        self.pipeline = pipeline
+        self.compact()
+
+    def compact(self):
+        """
+        Save the whole pipeline as a new snapshot and start an empty journal.
+        """
+        self.close()
+        self._changed_structures.clear()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        points = OPPSHandler().save(self.path, self.pipeline)
+        self._point_ids = {point: i for i, point in enumerate(points)}
+        self._next_point_id = len(points)
+        self._versions = self.pipeline.coordinates.versions.copy()
+        self._file = open(self.journal_path, "w", encoding="utf-8")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """
+        Delete the snapshot and the journal, like when the session ends well.
+        """
+        self.close()
+        self.path.unlink(missing_ok=True)
+        self.journal_path.unlink(missing_ok=True)
+
+    @classmethod
+    def recover(cls, path) -> Pipeline:
+        """
+        Load the snapshot and replay the journal on top of it. A flush that
+        was interrupted by the crash is not complete, so it is ignored.
+        """
+        path = Path(path)
+        pipeline = Pipeline()
+        points = dict(enumerate(OPPSHandler().load(path, pipeline)))
+
+        journal_path = path.with_name(path.name + ".journal")
+        if not journal_path.exists():
+            return pipeline
+
+        pending = []
+        with open(journal_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+
+                if record[0] != "c":
+                    pending.append(record)
+                    continue
+
+                for record in pending:
+                    cls._replay(record, pipeline, points)
+                pending.clear()
+
+        return pipeline
+
+    @classmethod
+    def _replay(cls, record, pipeline, points):
+        kind, *values = record
+
+        if kind == "p":
+            i, x, y, z = values
+            if i in points:
+                points[i].set_coords(x, y, z)
+            else:
+                points[i] = Point(x, y, z, store=pipeline.coordinates)
+
+        elif kind == "r":
+            (tag,) = values
+            structure = pipeline.get_structure(tag)
+            if structure is not None:
+                pipeline.remove_structure(structure)
+
+        elif kind == "s":
+            tag, order, name, ids, diameters, curvature, auto, color, normal = values
+            old = pipeline.get_structure(tag)
+            if old is not None:
+                pipeline.remove_structure(old)
+
+            structure_points = [points[i] for i in ids]
+            if name == "pipe":
+                structure = Pipe(*structure_points, *diameters)
+            elif name == "flange":
+                structure = Flange(*structure_points, np.array(normal), *diameters, auto=auto)
+            else:
+                structure = _KINDS[name](*structure_points, curvature, *diameters, auto=auto)
+
+            structure.color = tuple(color)
+            structure.tag = tag
+            pipeline.add_structure(structure, order=order)
+
+    def _group_changed(self, group):
+        self._changed_structures.update(dict.fromkeys(group.get_structures()))
+
+    def _point_record(self, point):
+        i = self._point_ids.get(point)
+        if i is None:
+            i = self._point_ids[point] = self._next_point_id
+            self._next_point_id += 1
+        return ["p", i, *point]
+
+    def _structure_record(self, structure):
+        name = next(name for name, cls in _KINDS.items() if isinstance(structure, cls))
+        ids = [self._point_ids[point] for point in structure.get_points()]
+        normal = None
+        curvature = None
+
+        if isinstance(structure, Flange):
+            normal = np.asarray(structure.normal, dtype=float).tolist()
+        if isinstance(structure, Bend):
+            curvature = structure.curvature
+
+        return [
+            "s",
+            structure.tag,
+            self.pipeline.get_order(structure),
+            name,
+            ids,
+            list(structure.get_diameters()),
+            curvature,
+            getattr(structure, "auto", None),
+            list(structure.color),
+            normal,
+        ]
+
+    def _forget_removed_points(self):
+        # Points only leave the pipeline with their structures,
+        # so there is nothing to check if none was removed.
+        if len(self._point_ids) <= self.pipeline.number_of_points():
+            return
+
+        self._point_ids = {
+            point: i for point, i in self._point_ids.items() if self.pipeline.has_point(point)
+        }
@@ -0,0 +1,233 @@
+import gc
+import json
+from contextlib import contextmanager
+
+import numpy as np
+
+from opps.model.bend import Bend
+from opps.model.elbow import Elbow
+from opps.model.flange import Flange
+from opps.model.pipe import Pipe
+from opps.model.point import Point
+
+# Layout of the file:
+#   magic, format version and size of the header (16 bytes)
+#   json header, describing the arrays and with the metadata
+#   arrays, each one starting at a multiple of _ALIGNMENT
+_MAGIC = b"OPPSFILE"
+_VERSION = 1
+_ALIGNMENT = 64
+
+# Kind of every structure. The order matters for subclasses,
+# an Elbow is also a Bend.
+_KINDS = (Elbow, Bend, Flange, Pipe)
+_ELBOW, _BEND, _FLANGE, _PIPE = range(len(_KINDS))
+
+
+class OPPSHandler:
+    """
+    Native format of the program.
+
+    The pipeline is stored as plain arrays, and it keeps everything the
+    other formats lose, like tags, insertion order, colors, auto flags
+    and the extra info of the structures.
+
+    To load, the coordinates are copied to the store in one go, the
+    structures of each kind are created from columns of the arrays, and
+    the pipeline is indexed with array operations. Opening a file with a
+    million structures takes a few seconds, most of them spent creating
+    the python objects.
+    """
+
+    def save(self, path, pipeline):
+        """
+        Returns the points of the pipeline in the order they were saved.
+        """
+        arrays, metadata, points = self.encode(pipeline)
+
+        offsets = dict()
+        position = 0
+        for name, array in arrays.items():
+            offsets[name] = dict(
+                dtype=array.dtype.str,
+                shape=array.shape,
+                offset=position,
+            )
+            position = _align(position + array.nbytes)
+
+        header = dict(arrays=offsets, **metadata)
+        header = json.dumps(header).encode("utf-8")
+        data_start = _align(16 + len(header))
+
+        with open(path, "wb") as file:
+            file.write(_MAGIC)
+            file.write(np.array([_VERSION, len(header)], dtype="<u4").tobytes())
+            file.write(header)
+            for name, array in arrays.items():
+                file.seek(data_start + offsets[name]["offset"])
+                file.write(np.ascontiguousarray(array).tobytes())
+            file.truncate(data_start + position)
+
+        return points
+
+    def load(self, path, pipeline):
+        """
+        Returns the points of the file, in the order they were saved.
+        """
+        arrays, metadata = self.read(path)
+        with _gc_paused():
+            structures, points = self.decode(arrays, metadata, pipeline.coordinates)
+            orders = arrays["orders"].tolist()
+            pipeline.set_structures(structures, orders, points, arrays["points"])
+        return points
+
+    def read(self, path):
+        """
+        Views of the arrays of the file, that are read
+        from the disk as they are decoded.
+        """
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        if raw[:8].tobytes() != _MAGIC:
+            raise ValueError(f'"{path}" is not an opps file.')
+
+        version, header_size = raw[8:16].view("<u4").tolist()
+        if version > _VERSION:
+            raise ValueError(f'"{path}" was saved by a newer version of opps.')
+
+        header = json.loads(raw[16 : 16 + header_size].tobytes().decode("utf-8"))
+        data_start = _align(16 + header_size)
+
+        arrays = dict()
+        for name, description in header.pop("arrays").items():
+            dtype = np.dtype(description["dtype"])
+            shape = tuple(description["shape"])
+            start = data_start + description["offset"]
+            end = start + dtype.itemsize * int(np.prod(shape))
+            arrays[name] = raw[start:end].view(dtype).reshape(shape)
+
+        return arrays, header
+
+    def encode(self, pipeline):
+        structures = list(pipeline.structures)
+        points = pipeline.get_points()
+
+        # Packed position of every point, indexed by its row in the store
+        rows = np.fromiter((point.index for point in points), dtype=np.intp, count=len(points))
+        positions = np.full(len(pipeline.coordinates.data), -1, dtype="<i8")
+        positions[rows] = np.arange(len(points))
+
+        size = len(structures)
+        kinds = np.zeros(size, dtype="u1")
+        structure_rows = np.full((size, 3), -1, dtype=np.intp)
+        diameters = np.zeros((size, 2), dtype="<f8")
+        curvatures = np.zeros(size, dtype="<f8")
+        colors = np.zeros((size, 3), dtype="u1")
+        auto = np.zeros(size, dtype="?")
+        tags = np.zeros(size, dtype="<i8")
+        orders = np.zeros(size, dtype="<i8")
+        normals = []
+        extra_info = dict()
+
+        for i, structure in enumerate(structures):
+            kind = next(k for k, cls in enumerate(_KINDS) if isinstance(structure, cls))
+            kinds[i] = kind
+            structure_points = structure.get_points()
+            structure_rows[i, : len(structure_points)] = [p.index for p in structure_points]
+            colors[i] = structure.color
+            tags[i] = structure.tag
+            orders[i] = pipeline.get_order(structure)
+
+            if kind == _FLANGE:
+                diameters[i] = structure.diameter
+                normals.append(structure.normal)
+                auto[i] = structure.auto
+            else:
+                diameters[i] = structure.get_diameters()
+
+            if kind in (_BEND, _ELBOW):
+                curvatures[i] = structure.curvature
+                auto[i] = structure.auto
+
+            if structure.has_extra_info():
+                extra_info[i] = structure.extra_info
+
+        arrays = dict(
+            coords=pipeline.coordinates.data[rows].astype("<f8"),
+            kinds=kinds,
+            points=np.where(structure_rows >= 0, positions[structure_rows], -1),
+            diameters=diameters,
+            curvatures=curvatures,
+            normals=np.array(normals, dtype="<f8").reshape(-1, 3),
+            colors=colors,
+            auto=auto,
+            tags=tags,
+            orders=orders,
+        )
+        metadata = dict(extra_info=extra_info)
+        return arrays, metadata, points
+
+    def decode(self, arrays, metadata, store):
+        # Every coordinate is copied to the store in one go, and the
+        # structures of each kind are created together, from columns.
+        rows = store.allocate_many(arrays["coords"]).tolist()
+        points = Point.from_indexes(store, rows)
+
+        kinds = np.asarray(arrays["kinds"])
+        structure_points = np.asarray(arrays["points"])
+        diameters = np.asarray(arrays["diameters"])
+        curvatures = np.asarray(arrays["curvatures"])
+        auto = np.asarray(arrays["auto"])
+        tags = np.asarray(arrays["tags"])
+
+        # identical colors share the same tuple
+        colors = np.asarray(arrays["colors"], dtype=np.uint32)
+        packed = colors[:, 0] << 16 | colors[:, 1] << 8 | colors[:, 2]
+        unique_colors, color_indexes = np.unique(packed, return_inverse=True)
+        unique_colors = [(c >> 16, c >> 8 & 255, c & 255) for c in unique_colors.tolist()]
+
+        structures = [None] * len(kinds)
+        for kind, cls in enumerate(_KINDS):
+            indexes = np.flatnonzero(kinds == kind)
+            if not len(indexes):
+                continue
+
+            def column(array, i=None):
+                values = array[indexes] if i is None else array[indexes, i]
+                return values.tolist()
+
+            a, b, c = (map(points.__getitem__, column(structure_points, i)) for i in range(3))
+            color = map(unique_colors.__getitem__, column(color_indexes))
+            d0, d1 = column(diameters, 0), column(diameters, 1)
+
+            if kind == _PIPE:
+                created = map(cls, a, b, d0, d1, color)
+            elif kind == _FLANGE:
+                created = map(cls, a, np.array(arrays["normals"]), d0, color, column(auto))
+            else:
+                created = map(cls, a, b, c, column(curvatures), d0, d1, color, column(auto))
+
+            for i, tag, structure in zip(indexes.tolist(), column(tags), created):
+                structure.tag = tag
+                structures[i] = structure
+
+        for i, info in metadata.get("extra_info", dict()).items():
+            structures[int(i)].extra_info.update(info)
+
+        return structures, points
+
+
+def _align(position):
+    return -(-position // _ALIGNMENT) * _ALIGNMENT
+
+
+@contextmanager
+def _gc_paused():
+    # Millions of objects are created, and none of them makes a cycle,
+    # but the collector would go through all of them again and again.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -1,4 +1,6 @@
-from pathlib import Path 
+from io import StringIO
+from itertools import chain, islice
+from pathlib import Path
 
 import numpy as np
 
@@ -6,47 +8,67 @@ from opps.model.bend import Bend
 from opps.model.elbow import Elbow
 from opps.model.flange import Flange
 from opps.model.pipe import Pipe
-from opps.model.point import Point
+
+_PIPE_RECORD = (
+    "\nPIPE"
+    "\n    END-POINT{:>14.4f}{:>13.4f}{:>13.4f}{:>15.4f}  "
+    "\n    END-POINT{:>14.4f}{:>13.4f}{:>13.4f}{:>15.4f}"
+)
+
+_BEND_RECORD = (
+    "\nBEND"
+    "\n    END-POINT{:>17.4f}{:>13.4f}{:>13.4f}{:>15.4f}  "
+    "\n    END-POINT{:>17.4f}{:>13.4f}{:>13.4f}{:>15.4f}   "
+    "\n    CENTRE-POINT{:>14.4f}{:>13.4f}{:>13.4f}   "
+    "\n    SKEY BEBW"
+)
+
+_ELBOW_RECORD = (
+    "\nELBOW"
+    "\n    END-POINT{:>14.4f}{:>11.4f}{:>13.4f}{:>13.4f}   "
+    "\n    END-POINT{:>14.4f}{:>11.4f}{:>13.4f}{:>13.4f}   "
+    "\n    CENTRE-POINT{:>14.4f}{:>11.4f}{:>13.4f}        "
+    "\n    SKEY                 ELBW"
+)
+
+_FLANGE_RECORD = (
+    "\nFLANGE"
+    "\n    END-POINT{:>14.4f}{:>13.4f}{:>13.4f}{:>15.4f}   "
+    "\n    END-POINT{:>14.4f}{:>13.4f}{:>13.4f}{:>15.4f}   "
+    "\n    SKEY FLBL"
+)
+
 
 class PCFExporter:
     def __init__(self) -> None:
         pass
 
-    def save(self, path, pipeline):
+    def save(self, path, pipeline, progress=None):
         path = Path(path).with_suffix(".pcf")
-        var = self.encoder(pipeline)
-         
-        with open(path, "w", encoding="iso_8859_1") as file:
-             file.write(var)
-    
-    def encoder(self, pipeline):
-
-        string = self.encoder_header(pipeline) 
-
-        for structure in pipeline.structures:
-            if isinstance(structure, Pipe):
-                stringer = self.encoder_pipe(structure)
-                string = string + "\n" + stringer
-
-            elif isinstance(structure, Elbow):
-                if structure.is_colapsed():
-                    continue
-                stringer = self.encoder_elbow(structure)
-                string = string + "\n" + stringer
-            
-            elif isinstance(structure, Bend):
-                if structure.is_colapsed():
-                    continue
-                stringer = self.encoder_bend(structure)
-                string = string + "\n" + stringer
+        with open(path, "w", encoding="iso_8859_1", buffering=2**16) as file:
+            self.write(file, pipeline, progress=progress)
 
-            elif isinstance(structure, Flange):
-                stringer = self.encoder_flange(structure)
-                string = string + "\n" + stringer
+    def encoder(self, pipeline):
+        file = StringIO()
+        self.write(file, pipeline)
+        return file.getvalue()
 
+    def write(self, file, pipeline, chunk_size=4096, progress=None):
+        """
+        Streams the records of the pipeline to a text file. The
+        structures are formatted in chunks, from arrays with
+        the coordinates of all their points.
+        """
+        file.write(self.encoder_header(pipeline))
 
-                
-        return string
+        written = 0
+        total = max(len(pipeline.structures), 1)
+        structures = iter(pipeline.structures)
+        while chunk := list(islice(structures, chunk_size)):
+            file.writelines(self.encode_records(chunk, pipeline.coordinates))
+            written += len(chunk)
+            if progress is not None:
+                progress(written / total)
 
     def encoder_header(self, pipeline):
     
@@ -62,43 +84,51 @@ START-CO-ORDS       0.0000       0.0000      0.0000 """
     
         return string
 
+    def encode_records(self, structures, store):
+        coords = store.get_coords(chain.from_iterable(s.get_points() for s in structures))
 
-    def encoder_pipe(self, pipe):
-       string = f"""PIPE
-    END-POINT{round(1000*pipe.start.x):>14.4f}{round(1000*pipe.start.y):>13.4f}{round(1000*pipe.start.z):>13.4f}{round(1000*pipe.start_diameter):>15.4f}  
-    END-POINT{round(1000*pipe.end.x):>14.4f}{round(1000*pipe.end.y):>13.4f}{round(1000*pipe.end.z):>13.4f}{round(1000*pipe.end_diameter):>15.4f}"""
-       
-       return string
-    
-    def encoder_bend(self, bend):
-       string = f"""BEND
-    END-POINT{round(1000*bend.start.x):>17.4f}{round(1000*bend.start.y):>13.4f}{round(1000*bend.start.z):>13.4f}{round(1000*bend.start_diameter):>15.4f}  
-    END-POINT{round(1000*bend.end.x):>17.4f}{round(1000*bend.end.y):>13.4f}{round(1000*bend.end.z):>13.4f}{round(1000*bend.end_diameter):>15.4f}   
-    CENTRE-POINT{round(1000*bend.corner.x):>14.4f}{round(1000*bend.corner.y):>13.4f}{round(1000*bend.corner.z):>13.4f}   
-    SKEY BEBW"""
-       
-       return string
-
-    def encoder_flange(self, flange):
-       end_x = round(flange.position.x + flange.normal[0], 2)
-       end_y = round(flange.position.y + flange.normal[1], 2)
-       end_z = round(flange.position.z + flange.normal[2], 2)
-
-       string = f"""FLANGE
-    END-POINT{round(1000*flange.position.x):>14.4f}{round(1000*flange.position.y):>13.4f}{round(1000*flange.position.z):>13.4f}{round(1000*flange.diameter):>15.4f}   
-    END-POINT{1000*end_x:>14.4f}{1000*end_y:>13.4f}{1000*end_z:>13.4f}{round(1000*flange.diameter):>15.4f}   
-    SKEY FLBL"""
-       
-       return string
-    
-    def encoder_elbow(self, bend):
-       
-       string = f"""ELBOW
-    END-POINT{round(1000*bend.start.x):>14.4f}{round(1000*bend.start.y):>11.4f}{round(1000*bend.start.z):>13.4f}{round(1000*bend.start_diameter):>13.4f}   
-    END-POINT{round(1000*bend.end.x):>14.4f}{round(1000*bend.end.y):>11.4f}{round(1000*bend.end.z):>13.4f}{round(1000*bend.end_diameter):>13.4f}   
-    CENTRE-POINT{round(1000*bend.corner.x):>14.4f}{round(1000*bend.corner.y):>11.4f}{round(1000*bend.corner.z):>13.4f}        
-    SKEY                 ELBW"""
-       
-       return string
-    
-    
+        # Adding zero turns the negative zeros into positive ones, like
+        # the integers python's round would give.
+        millimeters = (np.round(1000 * coords) + 0.0).tolist()
+
+        # Same as Bend.is_colapsed for joints starting at each row,
+        # where the end is the next row and the corner the one after.
+        colapsed = np.zeros(len(coords), dtype=bool)
+        if len(coords) > 2:
+            colapsed[:-2] = np.isclose(coords[:-2], coords[2:]).all(axis=1) & np.isclose(
+                coords[2:], coords[1:-1]
+            ).all(axis=1)
+        colapsed = colapsed.tolist()
+
+        offset = 0
+        for structure in structures:
+            if isinstance(structure, Pipe):
+                start, end = millimeters[offset : offset + 2]
+                yield _PIPE_RECORD.format(
+                    *start,
+                    round(1000 * structure.start_diameter),
+                    *end,
+                    round(1000 * structure.end_diameter),
+                )
+
+            elif isinstance(structure, Bend) and not colapsed[offset]:
+                record = _ELBOW_RECORD if isinstance(structure, Elbow) else _BEND_RECORD
+                start, end, corner = millimeters[offset : offset + 3]
+                yield record.format(
+                    *start,
+                    round(1000 * structure.start_diameter),
+                    *end,
+                    round(1000 * structure.end_diameter),
+                    *corner,
+                )
+
+            elif isinstance(structure, Flange):
+                position = millimeters[offset]
+                # python's round of each coordinate, like it always was
+                end = [
+                    1000 * round(x + n, 2) for x, n in zip(coords[offset].tolist(), structure.normal)
+                ]
+                diameter = round(1000 * structure.diameter)
+                yield _FLANGE_RECORD.format(*position, diameter, *end, diameter)
+
+            offset += len(structure.get_points())
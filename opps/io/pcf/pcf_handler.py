@@ -1,7 +1,7 @@
-from itertools import pairwise
+import os
+from itertools import islice
 
 import numpy as np
-import math
 
 from opps.model.bend import Bend
 from opps.model.elbow import Elbow
@@ -14,152 +14,156 @@ class PCFHandler:
     def __init__(self):
         pass
 
-    def load(self, path, pipeline):
-
+    def load(self, path, pipeline, progress=None):
+        # The file is read one component at a time, so
+        # only the model itself needs to fit in memory.
         with open(path, "r", encoding="iso_8859_1") as c2:
-            lines = c2.readlines()
-            groups = self.group_structures(lines)
-            pipeline.structures = self.create_classes(groups)
-
-    def group_structures(self,lines_list):
-        structures_list = []
-        index_list = []
-        lines_list.append("")
+            lines = c2
+            if progress is not None:
+                lines = self.report_progress(c2, os.path.getsize(path), progress)
 
-        for i, line in enumerate(lines_list):
+            groups = self.group_structures(lines)
+            # Points are created in the store of the pipeline, so
+            # adding the structures to it doesn't copy them again.
+            pipeline.structures = self.create_classes(groups, pipeline.coordinates)
+
+    def report_progress(self, lines, size, progress, interval=4096):
+        """
+        Calls progress with the fraction of the file that was read,
+        once every few lines. The encoding has a byte per character.
+        """
+        read = 0
+        for i, line in enumerate(lines):
+            read += len(line)
+            if i % interval == 0:
+                progress(read / max(size, 1))
+            yield line
+        progress(1)
+
+    def group_structures(self, lines):
+        """
+        Lazily yields the lines of each component.
+        Every line that is not indented starts a new component.
+        """
+        group = None
+        for line in lines:
             if line[0:4] != "    ":
-                index_list.append(i)
-        for a, b in pairwise(index_list):
-            structures_list.append(lines_list[a:b])
-
-        return structures_list
-
-
-    def create_classes(self,groups):
-        objects = []
+                if group is not None:
+                    yield group
+                group = []
+
+            if group is not None:
+                group.append(line)
+
+        if group is not None:
+            yield group
+
+    def create_classes(self, groups, store, chunk_size=4096):
+        # The numbers of many components are decoded together, but
+        # in chunks, so memory stays bounded for large files.
+        groups = iter(groups)
+        while chunk := list(islice(groups, chunk_size)):
+            yield from self.decode_components(chunk, store)
+
+    def decode_components(self, groups, store):
+        """
+        Creates the structures of many components at once.
+
+        The END-POINT and CENTRE-POINT records are collected into arrays,
+        converted from millimeters a single time and the curvatures of
+        every bend and elbow are computed together.
+        """
+        kinds = []
+        end_points = []
+        centre_points = []
         for group in groups:
-            if group[0].strip() == "PIPE":
-                pipe = self.create_pipe(group)
-                objects.append(pipe)
-
-            elif group[0].strip() == "BEND":
-                bend = self.create_bend(group)
-                objects.append(bend)
-
-            elif group[0].strip() == "FLANGE":
-                flange = self.create_flange(group)
-                objects.append(flange)
-
-            elif group[0].strip() == "ELBOW":
-                elbow = self.create_elbow(group)
-                objects.append(elbow)
-
-        return objects
-
-
-    def create_pipe(self,group):
-        _, x0, y0, z0, r0 = group[1].split()
-        _, x1, y1, z1, r1 = group[2].split()
-
-        start = Point(float(x0) / 1000, float(y0) / 1000, float(z0) / 1000)
-        end = Point(float(x1) / 1000, float(y1) / 1000, float(z1) / 1000)
-        radius = float(r0) / 1000
-
-        return Pipe(start, end, radius, radius)
-
-
-    def create_bend(self,group):
-        _, x0, y0, z0, d0 = group[1].split()
-        _, x1, y1, z1, d1 = group[2].split()
-        _, x2, y2, z2 = group[3].split()
-
-        start = Point(float(x0) / 1000, float(y0) / 1000, float(z0) / 1000)
-        end = Point(float(x1) / 1000, float(y1) / 1000, float(z1) / 1000)
-        corner = Point(float(x2) / 1000, float(y2) / 1000, float(z2) / 1000)
-        start_radius = float(d0) / 1000
-        end_radius = float(d1) / 1000 
-
-        start_coords = np.array([float(x0) / 1000, float(y0) / 1000, float(z0) / 1000])
-        end_coords = np.array([float(x1) / 1000, float(y1) / 1000, float(z1) / 1000])
-        corner_coords = np.array([float(x2) / 1000, float(y2) / 1000, float(z2) / 1000])
-
-        a_vector = start_coords - corner_coords
-        b_vector = end_coords - corner_coords
-        c_vector = a_vector + b_vector
-        c_vector_normalized = c_vector / np.linalg.norm(c_vector)
-
-        norm_a_vector = np.linalg.norm(a_vector)
-        norm_b_vector = np.linalg.norm(b_vector)
-
-        corner_distance = norm_a_vector / np.sqrt(0.5 * ((np.dot(a_vector, b_vector) / (norm_a_vector * norm_b_vector)) + 1))
-
-        center_coords = corner_coords + c_vector_normalized * corner_distance
-
-        start_curve_radius = math.dist(center_coords, start_coords)
-        end_curve_radius = math.dist(center_coords, end_coords)
-        radius = 0.5 * (start_curve_radius + end_curve_radius)
-        
-        return Bend(
-            start,
-            end,
-            corner,  
-            curvature = radius,
-            start_diameter = start_radius,
-            end_diameter = end_radius,
-            auto = False,
+            kind = group[0].strip()
+            if kind not in ("PIPE", "BEND", "FLANGE", "ELBOW"):
+                continue
+
+            kinds.append(kind)
+            end_points.extend(_numbers(group, 1, 4))
+            end_points.extend(_numbers(group, 2, 4))
+            if kind in ("BEND", "ELBOW"):
+                centre_points.extend(_numbers(group, 3, 3))
+
+        # [component, end point, (x, y, z, diameter)]
+        end_points = np.array(end_points, dtype=float).reshape(-1, 2, 4) / 1000
+        centre_points = np.array(centre_points, dtype=float).reshape(-1, 3) / 1000
+
+        is_curve = np.isin(kinds, ("BEND", "ELBOW"))
+        curvatures = curvature_radii(
+            end_points[is_curve, 0, :3],
+            end_points[is_curve, 1, :3],
+            centre_points,
         )
 
-
-    def create_flange(self,group):
-        _, x0, y0, z0, r0 = group[1].split()
-        _, x1, y1, z1, r1 = group[2].split()
-
-        start = Point(float(x0) / 1000, float(y0) / 1000, float(z0) / 1000)
-        end = Point(float(x1) / 1000, float(y1) / 1000, float(z1) / 1000)
-        position = start
-        normal = start.coords() - end.coords()
-        start_radius = float(r0) / 1000
-
-        return Flange(position, normal, start_radius)
-
-
-    def create_elbow(self,group):
-        _, x0, y0, z0, r0 = group[1].split()
-        _, x1, y1, z1, r1 = group[2].split()
-        _, x2, y2, z2 = group[3].split()
-
-        start = Point(float(x0) / 1000, float(y0) / 1000, float(z0) / 1000)
-        end = Point(float(x1) / 1000, float(y1) / 1000, float(z1) / 1000)
-        corner = Point(float(x2) / 1000, float(y2) / 1000, float(z2) / 1000)
-        start_radius = float(r0) / 1000
-        end_radius = float(r1) / 1000
-
-        start_coords = np.array([float(x0) / 1000, float(y0) / 1000, float(z0) / 1000])
-        end_coords = np.array([float(x1) / 1000, float(y1) / 1000, float(z1) / 1000])
-        corner_coords = np.array([float(x2) / 1000, float(y2) / 1000, float(z2) / 1000])
-
-        a_vector = start_coords - corner_coords
-        b_vector = end_coords - corner_coords
-        c_vector = a_vector + b_vector
-        c_vector_normalized = c_vector / np.linalg.norm(c_vector)
-
-        norm_a_vector = np.linalg.norm(a_vector)
-        norm_b_vector = np.linalg.norm(b_vector)
-
-        corner_distance = norm_a_vector / np.sqrt(0.5 * ((np.dot(a_vector, b_vector) / (norm_a_vector * norm_b_vector)) + 1))
-
-        center_coords = corner_coords + c_vector_normalized * corner_distance
-
-        start_curve_radius = math.dist(center_coords, start_coords)
-        end_curve_radius = math.dist(center_coords, end_coords)
-        radius = 0.5 * (start_curve_radius + end_curve_radius)
-
-        return Elbow(
-            start,
-            end,
-            corner,
-            curvature=radius,
-            start_diameter=start_radius,
-            end_diameter=end_radius,
-            auto=False,
-        )
+        coords = np.concatenate((end_points[:, :, :3].reshape(-1, 3), centre_points))
+        rows = store.allocate_many(coords).tolist()
+        points = [Point.from_index(store, row) for row in rows]
+
+        ends = iter(points[: 2 * len(kinds)])
+        corners = iter(points[2 * len(kinds) :])
+        diameters = end_points[:, :, 3].tolist()
+        normals = end_points[:, 0, :3] - end_points[:, 1, :3]
+        curvatures = iter(curvatures.tolist())
+
+        for i, kind in enumerate(kinds):
+            start, end = next(ends), next(ends)
+            start_diameter, end_diameter = diameters[i]
+
+            if kind == "PIPE":
+                yield Pipe(start, end, start_diameter, start_diameter)
+
+            elif kind == "FLANGE":
+                yield Flange(start, normals[i], start_diameter)
+
+            else:
+                _type = Bend if kind == "BEND" else Elbow
+                yield _type(
+                    start,
+                    end,
+                    next(corners),
+                    curvature=next(curvatures),
+                    start_diameter=start_diameter,
+                    end_diameter=end_diameter,
+                    auto=False,
+                )
+
+
+def _numbers(group, i, count):
+    """
+    The numbers of the i-th line of a component, after its name. A line
+    with more or less of them would shift the fields of the next ones.
+    """
+    kind = group[0].strip()
+    if i >= len(group):
+        raise ValueError(f"{kind} is missing line {i} of {count} numbers.")
+
+    fields = group[i].split()
+    if len(fields) != count + 1:
+        raise ValueError(f'{kind} line "{group[i].strip()}" should have {count} numbers.')
+    return fields[1:]
+
+
+def curvature_radii(starts, ends, corners):
+    """
+    Radii of the arcs tangent to the segments from the corners to the
+    starts and ends, averaged between both sides.
+    """
+    a_vectors = starts - corners
+    b_vectors = ends - corners
+    c_vectors = a_vectors + b_vectors
+
+    a_norms = np.linalg.norm(a_vectors, axis=1)
+    b_norms = np.linalg.norm(b_vectors, axis=1)
+    c_norms = np.linalg.norm(c_vectors, axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cosines = np.einsum("ij,ij->i", a_vectors, b_vectors) / (a_norms * b_norms)
+        corner_distances = a_norms / np.sqrt(0.5 * (cosines + 1))
+        centers = corners + c_vectors * (corner_distances / c_norms)[:, None]
+
+    start_radii = np.linalg.norm(centers - starts, axis=1)
+    end_radii = np.linalg.norm(centers - ends, axis=1)
+    return 0.5 * (start_radii + end_radii)
@@ -1,4 +1,5 @@
 from .bend import Bend
+from .coordinate_store import CoordinateStore
 from .elbow import Elbow
 from .flange import Flange
 from .pipe import Pipe
@@ -10,7 +10,7 @@ def normalize(vector):
     return vector / np.linalg.norm(vector)
 
 
-@dataclass
+@dataclass(eq=False)
 class Bend(Structure):
     start: Point
     end: Point
@@ -23,24 +23,65 @@ class Bend(Structure):
 
     @property
     def center(self):
+        center, *_ = self._derived_geometry()
+        return center
+
+    @property
+    def arc_angle(self):
+        _, arc_angle, *_ = self._derived_geometry()
+        return arc_angle
+
+    @property
+    def arc_length(self):
+        *_, arc_length, _ = self._derived_geometry()
+        return arc_length
+
+    @property
+    def tangent_distance(self):
+        *_, tangent_distance = self._derived_geometry()
+        return tangent_distance
+
+    def _derived_geometry(self):
+        # Rendering and exporting ask for the center many times, so it is
+        # only computed again if some point or the curvature changes.
+        points = (self.start, self.end, self.corner)
+        key = (*(point.version for point in points), self.curvature)
+
+        cache = getattr(self, "_geometry_cache", None)
+        if cache is not None:
+            cached_points, cached_key, geometry = cache
+            same_points = all(a is b for a, b in zip(cached_points, points))
+            if same_points and cached_key == key:
+                return geometry
+
+        geometry = self._compute_geometry()
+        self._geometry_cache = (points, key, geometry)
+        return geometry
+
+    def _compute_geometry(self):
         if self.is_colapsed():
-            return self.corner
+            return self.corner, 0, 0, 0
 
         a_vector = normalize(self.start.coords() - self.corner.coords())
         b_vector = normalize(self.end.coords() - self.corner.coords())
 
         if (a_vector == b_vector).all():
-            return self.corner
+            return self.corner, 0, 0, 0
 
         if np.dot(a_vector, b_vector) == 1:
-            return self.corner
+            return self.corner, 0, 0, 0
 
         sin_angle = np.linalg.norm(a_vector - b_vector) / 2
         angle = np.arcsin(sin_angle)
         center_distance = self.curvature / np.sin(angle)
 
         c_vector = normalize(a_vector + b_vector)
-        return Point(*(self.corner.coords() + c_vector * center_distance))
+        center = Point(*(self.corner.coords() + c_vector * center_distance))
+
+        arc_angle = np.pi - 2 * angle
+        arc_length = self.curvature * arc_angle
+        tangent_distance = self.curvature / np.tan(angle)
+        return center, arc_angle, arc_length, tangent_distance
 
     def normalize_values(self, start: Point, end: Point):
         if (start.coords() == self.corner.coords()).all():
@@ -102,6 +143,9 @@ class Bend(Structure):
             self.corner,
         ]
 
+    def set_points(self, points):
+        self.start, self.end, self.corner = points
+
     def as_vtk(self):
         from opps.interface.viewer_3d.actors.bend_actor import BendActor
 
@@ -111,9 +155,12 @@ class Bend(Structure):
         return id(self)
     
     def replace_point(self, old, new):
-        if self.start == old:
+        if self.start is old:
             self.start = new
-    
-        elif self.end == old:
+
+        if self.end is old:
             self.end = new
 
+        if self.corner is old:
+            self.corner = new
+
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class CoordinateStore:
+    """
+    Contiguous N x 3 buffer with the coordinates of many points.
+
+    Each point only keeps the index of its row, so reading coordinates
+    doesn't allocate anything and the whole model can be processed
+    with vectorized operations over `data`.
+    """
+
+    def __init__(self, dtype=np.float64, capacity=64):
+        self.data = np.zeros((capacity, 3), dtype=dtype)
+        # Modification counter of every row, used to invalidate caches
+        self.versions = np.zeros(capacity, dtype=np.int64)
+        self._size = 0
+        self._free_rows = []
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    def allocate(self, coords=(0, 0, 0)) -> int:
+        if self._free_rows:
+            index = self._free_rows.pop()
+        else:
+            if self._size == len(self.data):
+                self._grow(self._size + 1)
+            index = self._size
+            self._size += 1
+
+        self.data[index] = coords
+        return index
+
+    def allocate_many(self, coords) -> np.ndarray:
+        coords = np.asarray(coords).reshape(-1, 3)
+        reused = min(len(coords), len(self._free_rows))
+        new = len(coords) - reused
+
+        if self._size + new > len(self.data):
+            self._grow(self._size + new)
+
+        free_rows = [self._free_rows.pop() for _ in range(reused)]
+        indexes = np.concatenate(
+            (
+                np.array(free_rows, dtype=np.intp),
+                np.arange(self._size, self._size + new, dtype=np.intp),
+            )
+        )
+        self._size += new
+
+        self.data[indexes] = coords
+        return indexes
+
+    def release(self, index: int):
+        self._free_rows.append(index)
+
+    def set_coords(self, indexes, coords):
+        self.data[indexes] = coords
+        self.versions[indexes] += 1
+
+    def get_coords(self, points) -> np.ndarray:
+        indexes = np.fromiter((point.index for point in points), dtype=np.intp)
+        return self.data[indexes]
+
+    def _grow(self, minimum_capacity):
+        # Views returned before the growth keep pointing to the old buffer,
+        # so they should not be stored for long.
+        capacity = max(minimum_capacity, 2 * len(self.data))
+        data = np.zeros((capacity, 3), dtype=self.data.dtype)
+        data[: self._size] = self.data[: self._size]
+        self.data = data
+
+        versions = np.zeros(capacity, dtype=np.int64)
+        versions[: self._size] = self.versions[: self._size]
+        self.versions = versions
+
+    def __len__(self):
+        return self._size - len(self._free_rows)
+
+
+# Points that don't belong to a pipeline yet live here.
+default_store = CoordinateStore()
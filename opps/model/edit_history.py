@@ -0,0 +1,368 @@
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from opps.model.bend import Bend
+from opps.model.point import Point
+from opps.model.structure import Structure
+
+# Rough sizes used to keep the history inside its memory budget
+_COMMAND_SIZE = 120
+_POINT_SIZE = 100
+_STRUCTURE_SIZE = 400
+
+
+@dataclass
+class AddStructure:
+    structure: Structure
+    order: int
+
+    def undo(self, editor):
+        # The tangent points of automatic joints go back to the
+        # corner, as if the joint was never there.
+        if isinstance(self.structure, Bend) and self.structure.auto:
+            self.structure.colapse()
+
+        editor.mark_dirty(self.structure)
+        editor.pipeline.remove_structure(self.structure)
+
+    def redo(self, editor):
+        editor.pipeline.add_structure(self.structure, order=self.order)
+        editor.mark_dirty(self.structure)
+
+    def merge(self, command):
+        return False
+
+    def get_structures(self):
+        return [self.structure]
+
+    def nbytes(self):
+        # the structure belongs to the pipeline
+        return _COMMAND_SIZE
+
+
+@dataclass
+class RemoveStructure(AddStructure):
+    def undo(self, editor):
+        super().redo(editor)
+
+    def redo(self, editor):
+        super().undo(editor)
+
+    def nbytes(self):
+        # only the command keeps the removed structure alive
+        return _COMMAND_SIZE + _STRUCTURE_SIZE + _POINT_SIZE * len(self.structure.get_points())
+
+
+@dataclass
+class AddStructures:
+    """
+    Many structures added at once, like the ones of a route.
+    """
+
+    structures: list
+    orders: list
+
+    def undo(self, editor):
+        for structure in reversed(self.structures):
+            AddStructure(structure, None).undo(editor)
+
+    def redo(self, editor):
+        editor.pipeline.add_structures(self.structures, self.orders)
+        editor.mark_dirty(*self.structures)
+
+    def merge(self, command):
+        return False
+
+    def get_structures(self):
+        return self.structures
+
+    def nbytes(self):
+        # a reference and an order for each structure of the pipeline
+        return _COMMAND_SIZE + 16 * len(self.structures)
+
+
+@dataclass
+class MovePoint:
+    point: Point
+    old_coords: tuple
+    new_coords: tuple
+
+    def undo(self, editor):
+        self.point.set_coords(*self.old_coords)
+        editor.mark_dirty(self.point)
+
+    def redo(self, editor):
+        self.point.set_coords(*self.new_coords)
+        editor.mark_dirty(self.point)
+
+    def merge(self, command):
+        # Edit boxes move a point once for every key pressed
+        if not isinstance(command, MovePoint) or command.point is not self.point:
+            return False
+        self.new_coords = command.new_coords
+        return True
+
+    def get_structures(self):
+        # the coordinates of points are not part of any structure
+        return []
+
+    def nbytes(self):
+        return _COMMAND_SIZE + _POINT_SIZE
+
+
+@dataclass
+class SetAttribute:
+    structure: Structure
+    name: str
+    old_value: object
+    new_value: object
+
+    def undo(self, editor):
+        setattr(self.structure, self.name, self.old_value)
+        editor.mark_dirty(self.structure)
+
+    def redo(self, editor):
+        setattr(self.structure, self.name, self.new_value)
+        editor.mark_dirty(self.structure)
+
+    def merge(self, command):
+        if not isinstance(command, SetAttribute):
+            return False
+        if command.structure is not self.structure or command.name != self.name:
+            return False
+        self.new_value = command.new_value
+        return True
+
+    def get_structures(self):
+        return [self.structure]
+
+    def nbytes(self):
+        return _COMMAND_SIZE
+
+
+@dataclass
+class SetDiameter:
+    structure: Structure
+    old_diameters: list
+    new_diameters: list
+
+    def undo(self, editor):
+        self.structure.set_diameter(*self.old_diameters)
+
+    def redo(self, editor):
+        self.structure.set_diameter(*self.new_diameters)
+
+    def merge(self, command):
+        if not isinstance(command, SetDiameter) or command.structure is not self.structure:
+            return False
+        self.new_diameters = command.new_diameters
+        return True
+
+    def get_structures(self):
+        return [self.structure]
+
+    def nbytes(self):
+        return _COMMAND_SIZE
+
+
+@dataclass
+class MergePoints:
+    """
+    Points of many structures replaced at once. The points of all the
+    structures, before and after, are kept in two flat lists.
+    """
+
+    structures: list
+    old_points: list
+    new_points: list
+    # points that left the pipeline, and are only kept alive by the command
+    merged: int
+
+    def undo(self, editor):
+        editor.pipeline.set_structure_points(self.structures, self._split(self.old_points))
+        editor.mark_dirty(*self.old_points)
+
+    def redo(self, editor):
+        replaced = {
+            old: new for old, new in zip(self.old_points, self.new_points) if old is not new
+        }
+        editor.pipeline.replace_points(replaced)
+        editor.mark_dirty(*replaced.values())
+
+    def merge(self, command):
+        return False
+
+    def get_structures(self):
+        return self.structures
+
+    def nbytes(self):
+        references = 8 * (len(self.structures) + 2 * len(self.old_points))
+        return _COMMAND_SIZE + references + _POINT_SIZE * self.merged
+
+    def _split(self, points):
+        start = 0
+        for structure in self.structures:
+            end = start + len(structure.get_points())
+            yield points[start:end]
+            start = end
+
+
+@dataclass
+class CommandGroup:
+    commands: list = field(default_factory=list)
+
+    def undo(self, editor):
+        for command in reversed(self.commands):
+            command.undo(editor)
+
+    def redo(self, editor):
+        for command in self.commands:
+            command.redo(editor)
+
+    def get_structures(self):
+        return [structure for command in self.commands for structure in command.get_structures()]
+
+    def nbytes(self):
+        return sum(command.nbytes() for command in self.commands)
+
+
+class EditHistory:
+    """
+    Undo and redo stacks made of small inverse commands.
+
+    The commands recorded between two calls of `close_group` are undone
+    together. The oldest groups are forgotten when the estimated memory
+    of the history goes beyond `memory_budget` bytes.
+    """
+
+    def __init__(self, memory_budget=16 * 2**20):
+        self.memory_budget = memory_budget
+        self.memory = 0
+
+        self._undo_groups = deque()
+        self._redo_groups = list()
+        self._pending = CommandGroup()
+        self._recording = True
+
+        # Called with every group that is closed, undone or redone
+        self._listeners = list()
+
+    def record(self, command):
+        if not self._recording:
+            return
+
+        if self._redo_groups:
+            self.memory -= sum(group.nbytes() for group in self._redo_groups)
+            self._redo_groups.clear()
+
+        commands = self._pending.commands
+        if commands and commands[-1].merge(command):
+            return
+
+        commands.append(command)
+        self.memory += command.nbytes()
+
+    def forget_structures(self, structures):
+        """
+        Drop the pending additions of the given structures, for
+        when they are discarded before being committed.
+        """
+        structures = set(structures)
+        kept = list()
+        for command in self._pending.commands:
+            if type(command) is AddStructure and command.structure in structures:
+                self.memory -= command.nbytes()
+                continue
+
+            if type(command) is AddStructures:
+                self.memory -= command.nbytes()
+                remaining = [
+                    (structure, order)
+                    for structure, order in zip(command.structures, command.orders)
+                    if structure not in structures
+                ]
+                if not remaining:
+                    continue
+                command = AddStructures(*map(list, zip(*remaining)))
+                self.memory += command.nbytes()
+
+            kept.append(command)
+        self._pending.commands = kept
+
+    def close_group(self):
+        if not self._pending.commands:
+            return
+
+        group = self._pending
+        self._undo_groups.append(group)
+        self._pending = CommandGroup()
+        self._enforce_budget()
+        self._notify(group)
+
+    def pending_structures(self):
+        """
+        Structures changed by the group that was not closed yet.
+        """
+        return self._pending.get_structures()
+
+    def can_undo(self):
+        return bool(self._pending.commands or self._undo_groups)
+
+    def can_redo(self):
+        return bool(self._redo_groups)
+
+    def undo(self, editor):
+        self.close_group()
+        if not self._undo_groups:
+            return False
+
+        group = self._undo_groups.pop()
+        with self.paused():
+            group.undo(editor)
+        self._redo_groups.append(group)
+        self._notify(group)
+        return True
+
+    def redo(self, editor):
+        if not self._redo_groups:
+            return False
+
+        group = self._redo_groups.pop()
+        with self.paused():
+            group.redo(editor)
+        self._undo_groups.append(group)
+        self._notify(group)
+        return True
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def clear(self):
+        self._undo_groups.clear()
+        self._redo_groups.clear()
+        self._pending = CommandGroup()
+        self.memory = 0
+
+    @contextmanager
+    def paused(self):
+        recording = self._recording
+        self._recording = False
+        try:
+            yield
+        finally:
+            self._recording = recording
+
+    def _notify(self, group):
+        for callback in self._listeners:
+            callback(group)
+
+    def _enforce_budget(self):
+        # The newest group is kept even if it is bigger than the
+        # budget by itself, or the last edit could not be undone.
+        while len(self._undo_groups) > 1 and self.memory > self.memory_budget:
+            group = self._undo_groups.popleft()
+            self.memory -= group.nbytes()
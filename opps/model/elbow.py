@@ -10,7 +10,7 @@ def normalize(vector):
     return vector / np.linalg.norm(vector)
 
 
-@dataclass
+@dataclass(eq=False)
 class Elbow(Bend):
     def as_vtk(self):
         from opps.interface.viewer_3d.actors.elbow_actor import ElbowActor
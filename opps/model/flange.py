@@ -6,7 +6,7 @@ from opps.model.point import Point
 from opps.model.structure import Structure
 
 
-@dataclass
+@dataclass(eq=False)
 class Flange(Structure):
     position: Point
     normal: np.ndarray
@@ -17,9 +17,15 @@ class Flange(Structure):
     def get_points(self):
         return [self.position]
 
+    def set_points(self, points):
+        (self.position,) = points
+
     def set_diameter(self, diameter, *args):
         self.diameter = diameter
 
+    def get_diameters(self):
+        return [self.diameter]
+
     def as_vtk(self):
         from opps.interface.viewer_3d.actors.flange_actor import FlangeActor
 
@@ -29,10 +35,5 @@ class Flange(Structure):
         return id(self)
     
     def replace_point(self, old, new):
-        if self.start == old:
-            self.start = new
-
-        elif self.end == old:
-            self.end = new
-
-
+        if self.position is old:
+            self.position = new
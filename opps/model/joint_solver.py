@@ -0,0 +1,84 @@
+import numpy as np
+
+
+def solve_joints(corners, a_points, b_points, curvatures, a_sources=None, b_sources=None):
+    """
+    Vectorized version of Bend.normalize_values for many joints at once.
+
+    Every row describes a joint by its corner, the two points it connects
+    to and its curvature radius. Returns the new start and end of every
+    joint and a mask of the joints that could be normalized. The other
+    ones are returned colapsed into their corners.
+
+    When the point a joint connects to is the tangent point of a joint that
+    comes before it in the update order, `a_sources`/`b_sources` tell where
+    it comes from: `i` for the start of the joint `i`, `n + i` for its end
+    and -1 for points that are not tangent points. Like when the joints are
+    normalized one by one, the curve of that earlier joint leaves less room
+    to the current one.
+    """
+
+    starts, ends, solved = _solve(corners, a_points, b_points, curvatures)
+    if a_sources is None and b_sources is None:
+        return starts, ends, solved
+
+    n = len(corners)
+    if a_sources is None:
+        a_sources = np.full(n, -1)
+
+    if b_sources is None:
+        b_sources = np.full(n, -1)
+
+    # Sources always come before the joints they affect, so this converges
+    # in at most as many iterations as the longest chain of joints.
+    for _ in range(n):
+        tangent_points = np.concatenate((starts, ends))
+        current_a = _replace_sources(a_points, a_sources, tangent_points, solved)
+        current_b = _replace_sources(b_points, b_sources, tangent_points, solved)
+        starts, ends, new_solved = _solve(corners, current_a, current_b, curvatures)
+
+        converged = (new_solved == solved).all()
+        solved = new_solved
+        if converged:
+            break
+
+    return starts, ends, solved
+
+
+def _solve(corners, a_points, b_points, curvatures):
+    a_diff = a_points - corners
+    b_diff = b_points - corners
+    a_length = np.linalg.norm(a_diff, axis=1)
+    b_length = np.linalg.norm(b_diff, axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a_vectors = a_diff / a_length[:, None]
+        b_vectors = b_diff / b_length[:, None]
+
+        sin_angle = np.linalg.norm(a_vectors - b_vectors, axis=1) / 2
+        angle = np.arcsin(np.clip(sin_angle, 0, 1))
+        distances = np.cos(angle) * curvatures / np.sin(angle)
+
+        solved = (
+            a_diff.any(axis=1)
+            & b_diff.any(axis=1)
+            & ~(a_vectors == b_vectors).all(axis=1)
+            & (np.einsum("ij,ij->i", a_vectors, b_vectors) != 1)
+            & (distances < a_length)
+            & (distances < b_length)
+        )
+
+    distances = np.where(solved, distances, 0)[:, None]
+    starts = np.where(solved[:, None], corners + distances * a_vectors, corners)
+    ends = np.where(solved[:, None], corners + distances * b_vectors, corners)
+    return starts, ends, solved
+
+
+def _replace_sources(points, sources, tangent_points, solved):
+    n = len(solved)
+    replace = sources >= 0
+    replace[replace] = solved[sources[replace] % n]
+
+    points = points.copy()
+    points[replace] = tangent_points[sources[replace]]
+    return points
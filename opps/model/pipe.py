@@ -6,7 +6,7 @@ from opps.model.point import Point
 from opps.model.structure import Structure
 
 
-@dataclass
+@dataclass(eq=False)
 class Pipe(Structure):
     start: Point
     end: Point
@@ -27,6 +27,9 @@ class Pipe(Structure):
             self.end,
         ]
 
+    def set_points(self, points):
+        self.start, self.end = points
+
     def as_vtk(self):
         from opps.interface.viewer_3d.actors.pipe_actor import PipeActor
 
@@ -36,9 +39,8 @@ class Pipe(Structure):
         return id(self)
     
     def replace_point(self, old, new):
-        if self.start == old:
+        if self.start is old:
             self.start = new
-        
-        elif self.end == old:
+
+        if self.end is old:
             self.end = new
-        
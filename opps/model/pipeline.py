@@ -1,36 +1,312 @@
-from itertools import pairwise
+from collections.abc import ValuesView
+from itertools import chain, pairwise, repeat
 
 import numpy as np
 
-from opps.io.pcf.pcf_handler import *
 from opps.model.bend import Bend
+from opps.model.coordinate_store import CoordinateStore
+from opps.model.elbow import Elbow
 from opps.model.flange import Flange
+from opps.model.joint_solver import solve_joints
 from opps.model.pipe import Pipe
+from opps.model.point import Point
 from opps.model.structure import Structure
+from opps.model.validation import ValidationReport, validate_pipeline
 
 
 class Pipeline(Structure):
-    def __init__(self):
-        self.origin = Point(0, 0, 0)
-        self.structures: list[Structure] = []
-        self.points: list[Point] = []
-        self.control_points: list[Point] = []
+    def __init__(self, dtype=np.float64):
+        # Coordinates of every point of the pipeline are kept together
+        # so they can be read without allocations and processed in bulk.
+        self.coordinates = CoordinateStore(dtype)
+
+        self.origin = Point(0, 0, 0, store=self.coordinates)
+
+        # Maps every point to the structures that use it, so
+        # neighbourhood queries don't need to scan the whole model.
+        self._incidence: dict[Point, list[Structure]] = dict()
+
+        # Table with every point of the pipeline, without repetitions.
+        # The masks are indexed by the rows of the points in the coordinate
+        # store, so the coordinates can be taken directly from it.
+        self._point_rows: dict[int, Point] = dict()
+        self._point_mask = np.zeros(0, dtype=bool)
+        self._control_mask = np.zeros(0, dtype=bool)
+
+        # Structures are kept by their tag. Dicts preserve the insertion
+        # order and remove items in constant time.
+        self._structures: dict[int, Structure] = dict()
+        self._next_tag = 0
+
+        # Position of every structure in the insertion order, that is
+        # also the order in which the joints are normalized.
+        self._order: dict[Structure, int] = dict()
+        self._insertions = 0
+
+    @property
+    def structures(self) -> ValuesView[Structure]:
+        return self._structures.values()
+
+    @structures.setter
+    def structures(self, structures):
+        self.clear()
+        self.add_structures(structures)
+
+    @property
+    def points(self) -> list[Point]:
+        return [self.get_point(row) for row in self.point_rows()]
+
+    @property
+    def control_points(self) -> list[Point]:
+        return [self.get_point(row) for row in self.control_point_rows()]
+
+    def clear(self):
+        self._structures.clear()
+        self._incidence.clear()
+        self._point_rows.clear()
+        self._point_mask[:] = False
+        self._control_mask[:] = False
+        self._next_tag = 0
+        self._order.clear()
+        self._insertions = 0
+
+    def add_structure(self, structure, order=None):
+        self._insert_structure(structure, order)
+        for point in structure.get_points():
+            self._update_control_status(point)
+
+    def add_structures(self, structures, orders=None):
+        """
+        Add many structures at once, updating the control
+        status of each of their points a single time.
+        """
+        if orders is None:
+            orders = repeat(None)
+
+        points = dict()
+        for structure, order in zip(structures, orders):
+            self._insert_structure(structure, order)
+            points.update(dict.fromkeys(structure.get_points()))
+
+        for point in points:
+            self._update_control_status(point)
+
+    def set_structures(self, structures, orders, points, structure_points):
+        """
+        Bulk version of the structures setter, for structures with unique
+        tags and points in the coordinate store, like the ones of a file.
+        `structure_points` has the positions in `points` of the points of
+        every structure, padded with -1, so the indexes are built in bulk.
+        """
+        structures = list(structures)
+        tags = [structure.tag for structure in structures]
+        if len(set(tags)) != len(tags):
+            raise ValueError("The tags of the structures should be unique.")
+
+        self.clear()
+        if not structures:
+            return
+
+        # A point repeated in a structure, like in a colapsed bend, is used once
+        structure_points = np.asarray(structure_points)
+        size, width = structure_points.shape
+        used = structure_points >= 0
+        for i in range(1, width):
+            repeated = structure_points[:, :i] == structure_points[:, i, None]
+            used[:, i] &= ~repeated.any(axis=1)
+
+        owners = np.broadcast_to(np.arange(size)[:, None], used.shape)[used]
+        slots = np.broadcast_to(np.arange(width), used.shape)[used]
+        positions, numbers, counts = np.unique(
+            structure_points[used], return_inverse=True, return_counts=True
+        )
 
-    def add_structure(self, structure):
-        self.structures.append(structure)
+        # Structures incident to each point, in the order they were given
+        incident = owners[np.argsort(numbers, kind="stable")].tolist()
+        incident = [structures[i] for i in incident]
+        ends = np.cumsum(counts)
+        starts = (ends - counts).tolist()
+        indexed_points = [points[i] for i in positions.tolist()]
+        incident = [incident[a:b] for a, b in zip(starts, ends.tolist())]
+        self._incidence = dict(zip(indexed_points, incident))
+
+        # the masks grow to the size of the store
+        self._set_point_rows([], [])
+        rows = self._point_indexes(indexed_points)
+        self._point_rows = dict(zip(rows.tolist(), indexed_points))
+        self._point_mask[rows] = True
+
+        # The rules of _update_control_status, where the
+        # corners of the joints are their third point.
+        types = list(map(type, structures))
+        joint_types = {t for t in set(types) if issubclass(t, Bend | Elbow)}
+        pipe_types = {t for t in set(types) if issubclass(t, Pipe)}
+        joints = np.fromiter(map(joint_types.__contains__, types), bool, size)[owners]
+        pipes = np.fromiter(map(pipe_types.__contains__, types), bool, size)[owners]
+        auto = np.array([getattr(s, "auto", True) for s in structures])[owners]
+
+        def any_of(mask):
+            return np.bincount(numbers[mask], minlength=len(positions)) > 0
+
+        forced = any_of(joints & (~auto | (slots == 2)))
+        tangent = any_of(joints & auto & (slots != 2))
+        self._control_mask[rows] = forced | (any_of(pipes) & ~tangent)
+
+        orders = list(orders)
+        self._structures = dict(zip(tags, structures))
+        self._next_tag = max(tags) + 1
+        self._order = dict(zip(structures, orders))
+        self._insertions = max(orders) + 1
 
     def remove_structure(self, structure):
-        index = self.get_index(structure)
-        if index >= 0:
-            return self.structures.pop(index)
-
-    def get_index(self, structure):
-        index = -1
-        for i, s in enumerate(self.structures):
-            if id(s) == id(structure):
-                index = i
-                break
-        return index
+        if self._structures.get(structure.tag) is not structure:
+            return
+
+        self._unindex_structure(structure)
+        self._order.pop(structure)
+        return self._structures.pop(structure.tag)
+
+    def get_structure(self, tag):
+        return self._structures.get(tag)
+
+    def get_order(self, structure):
+        return self._order.get(structure)
+
+    def replace_point(self, old, new):
+        if old is new or old not in self._incidence:
+            return
+
+        new.set_store(self.coordinates)
+        if new not in self._incidence:
+            self._add_point_row(new)
+
+        for structure in self._incidence.pop(old):
+            structure.replace_point(old, new)
+            incident = self._incidence.setdefault(new, [])
+            if not any(s is structure for s in incident):
+                incident.append(structure)
+
+        self._remove_point_row(old)
+        self._update_control_status(new)
+
+    def replace_points(self, replaced):
+        """
+        Bulk version of replace_point, with a dict from old to new points.
+        The new points should not be replaced themselves.
+        """
+        incidence = self._incidence
+        replaced = {
+            old: new for old, new in replaced.items() if old is not new and old in incidence
+        }
+
+        added = []
+        for old, new in replaced.items():
+            target = incidence.get(new)
+            if target is None:
+                target = incidence[new] = []
+                added.append(new)
+
+            for structure in incidence.pop(old):
+                structure.replace_point(old, new)
+                if structure not in target:
+                    target.append(structure)
+
+        for point in added:
+            point.set_store(self.coordinates)
+        self._set_point_rows(added, list(replaced))
+
+        for point in dict.fromkeys(replaced.values()):
+            self._update_control_status(point)
+
+    def set_structure_points(self, structures, points):
+        """
+        Change the points of many structures at once, given as a list
+        for each of them, like when a merge of points is undone.
+        """
+        structures = list(structures)
+        points = [list(structure_points) for structure_points in points]
+        incidence = self._incidence
+
+        old_points = dict.fromkeys(chain.from_iterable(s.get_points() for s in structures))
+        new_points = dict.fromkeys(chain.from_iterable(points))
+        added = [point for point in new_points if point not in incidence]
+
+        # structures hash by a python method, ids are faster
+        moving = set(map(id, structures))
+        for point in old_points:
+            incident = [s for s in incidence[point] if id(s) not in moving]
+            if incident:
+                incidence[point] = incident
+            else:
+                del incidence[point]
+
+        for structure, structure_points in zip(structures, points):
+            structure.set_points(structure_points)
+            for point in dict.fromkeys(structure_points):
+                incidence.setdefault(point, []).append(structure)
+
+        removed = [point for point in old_points if point not in incidence]
+        for point in added:
+            point.set_store(self.coordinates)
+        self._set_point_rows(added, removed)
+
+        for point in new_points.keys() | (old_points.keys() - removed):
+            self._update_control_status(point)
+
+    def get_points(self):
+        return list(self._incidence)
+
+    def number_of_points(self):
+        # the origin is there even if nothing was created
+        return max(len(self._incidence), 1)
+
+    def get_point(self, row) -> Point:
+        if not self._point_rows:
+            return self.origin
+        return self._point_rows[row]
+
+    def point_rows(self) -> np.ndarray:
+        """
+        Rows of the coordinate store used by the points of the pipeline.
+        """
+        if not self._point_rows:
+            return np.array([self.origin.index])
+        return np.flatnonzero(self._point_mask)
+
+    def control_point_rows(self) -> np.ndarray:
+        if not self._point_rows:
+            return np.array([self.origin.index])
+        return np.flatnonzero(self._control_mask)
+
+    def points_coords(self) -> np.ndarray:
+        return self.coordinates.data[self.point_rows()]
+
+    def control_points_coords(self) -> np.ndarray:
+        return self.coordinates.data[self.control_point_rows()]
+
+    def has_point(self, point):
+        if not self._point_rows:
+            return point is self.origin
+        return self._point_rows.get(point.index) is point
+
+    def is_control_point(self, point):
+        if not self.has_point(point):
+            return False
+
+        if not self._point_rows:
+            return True
+
+        return bool(self._control_mask[point.index])
+
+    def connected_structures(self, point):
+        return list(self._incidence.get(point, []))
+
+    def validate(self, tolerance=1e-6) -> ValidationReport:
+        """
+        Looks for problems in the geometry, like zero length pipes, bends
+        that don't fit, or mismatched diameters, before it is exported.
+        """
+        return validate_pipeline(self, tolerance)
 
     def as_vtk(self):
         from opps.interface.viewer_3d.actors.pipeline_actor import (
@@ -39,8 +315,13 @@ class Pipeline(Structure):
 
         return PipelineActor(self)
 
-    def _update_flanges(self):
-        for flange in self.structures:
+    def _update_flanges(self, structures=None):
+        if structures is None:
+            structures = self.structures
+
+        flanges = []
+        oposite_points = []
+        for flange in structures:
             if not isinstance(flange, Flange):
                 continue
 
@@ -52,28 +333,62 @@ class Pipeline(Structure):
                 continue
 
             oposite_a, *_ = connected_points
-            flange.normal = flange.position.coords() - oposite_a.coords()
+            flanges.append(flange)
+            oposite_points.append(oposite_a)
+
+        if not flanges:
+            return
+
+        positions = self.coordinates.get_coords(flange.position for flange in flanges)
+        normals = positions - self.coordinates.get_coords(oposite_points)
+        for flange, normal in zip(flanges, normals):
+            flange.normal = normal
+
+    def _update_curvatures(self, structures=None):
+        """
+        Batched version of colapsing every joint and normalizing them
+        one by one with Bend.normalize_values, that is kept as reference.
+
+        If only some structures are given, the joints after them that
+        gain or lose room are solved again too, so the result is the
+        same as updating the whole pipeline. The tangent points that
+        moved are returned, because the flanges around them may turn.
+        """
+
+        if structures is None:
+            self._solve_joints(self._auto_joints(self.structures))
+            return
+
+        moved_points = dict()
+        joints = self._auto_joints(structures)
+        while joints:
+            moved = self._solve_joints(joints)
+            moved_points.update(dict.fromkeys(point for point, _ in moved))
+            followers = self._joints_following(moved, joints)
+            if not followers:
+                break
+            joints = self._auto_joints(joints + followers)
+        return list(moved_points)
+
+    def _solve_joints(self, joints):
+        if not joints:
+            return []
+
+        start_indexes = self._point_indexes(joint.start for joint in joints)
+        end_indexes = self._point_indexes(joint.end for joint in joints)
+        previous_starts = self.coordinates.data[start_indexes]
+        previous_ends = self.coordinates.data[end_indexes]
 
-    def _update_curvatures(self):
         # First colapse all joint that can be colapsed.
         # This prevents cases were a normalization of a
         # joint disturbs the normalization of others.
-        for joint in self.structures:
-            if not isinstance(joint, Bend | Elbow):
-                continue
-
-            if not joint.auto:
-                continue
-
-            joint.colapse()
-
-        for joint in self.structures:
-            if not isinstance(joint, Bend | Elbow):
-                continue
-
-            if not joint.auto:
-                continue
+        corners = self.coordinates.get_coords(joint.corner for joint in joints)
+        self.coordinates.set_coords(start_indexes, corners)
+        self.coordinates.set_coords(end_indexes, corners)
 
+        solvable_joints = []
+        oposite_points = []
+        for joint in joints:
             connected_points = (
                 self._connected_points(joint.start)
                 + self._connected_points(joint.end)
@@ -84,60 +399,221 @@ class Pipeline(Structure):
                 continue
 
             oposite_a, oposite_b, *_ = connected_points
-            joint.normalize_values(oposite_a, oposite_b)
-
-    def _update_points(self):
-        points = list()
-        control_points = list()
-        for structure in self.structures:
-            points.extend(structure.get_points())
-            if not isinstance(structure, Pipe):
-                continue
-            control_points.extend(structure.get_points())
-
-        point_to_index = {v: i for i, v in enumerate(control_points)}
-        indexes_to_remove = []
-
-        for structure in self.structures:
-            if not isinstance(structure, Bend | Elbow):
-                continue
-
-            if not structure.auto:
-                control_points.append(structure.corner)
-                control_points.append(structure.end)
-                control_points.append(structure.start)
+            solvable_joints.append(joint)
+            oposite_points.extend((oposite_a, oposite_b))
+
+        if solvable_joints:
+            self._normalize_joints(solvable_joints, oposite_points)
+
+        moved_starts = (self.coordinates.data[start_indexes] != previous_starts).any(axis=1)
+        moved_ends = (self.coordinates.data[end_indexes] != previous_ends).any(axis=1)
+        moved = [(joints[i].start, joints[i]) for i in np.flatnonzero(moved_starts)]
+        moved += [(joints[i].end, joints[i]) for i in np.flatnonzero(moved_ends)]
+        return moved
+
+    def _normalize_joints(self, joints, oposite_points):
+        # A joint connected to the tangent point of a joint normalized
+        # before it has less room to fit its curve.
+        n = len(joints)
+        tangent_points = dict()
+        for i, joint in enumerate(joints):
+            tangent_points[joint.start] = i
+            tangent_points[joint.end] = n + i
+
+        sources = np.array([tangent_points.get(p, -1) for p in oposite_points]).reshape(-1, 2)
+        sources[sources % n >= np.arange(n)[:, None]] = -1
+
+        oposites = self.coordinates.get_coords(oposite_points)
+
+        # Joints that are not being solved keep their tangent points,
+        # unless they come later and would be colapsed at this moment.
+        for i, point in enumerate(oposite_points):
+            if point in tangent_points:
                 continue
 
-            control_points.append(structure.corner)
-            if structure.start in point_to_index:
-                indexes_to_remove.append(point_to_index[structure.start])
+            other = self._tangent_joint(point)
+            if other is not None and self._order[other] > self._order[joints[i // 2]]:
+                oposites[i] = other.corner.coords()
 
-            if structure.end in point_to_index:
-                indexes_to_remove.append(point_to_index[structure.end])
+        corners = self.coordinates.get_coords(joint.corner for joint in joints)
+        curvatures = np.array([joint.curvature for joint in joints], dtype=float)
 
-        for i in sorted(indexes_to_remove, reverse=True):
-            control_points.pop(i)
-
-        if not control_points and not points:
-            control_points.append(self.origin)
-            points.append(self.origin)
+        starts, ends, solved = solve_joints(
+            corners,
+            oposites[0::2],
+            oposites[1::2],
+            curvatures,
+            sources[:, 0],
+            sources[:, 1],
+        )
 
-        self.control_points = list(control_points)
-        self.points = list(points)
+        start_indexes = self._point_indexes(joint.start for joint in joints)
+        end_indexes = self._point_indexes(joint.end for joint in joints)
+        self.coordinates.set_coords(start_indexes[solved], starts[solved])
+        self.coordinates.set_coords(end_indexes[solved], ends[solved])
+
+    def _joints_following(self, moved, joints):
+        """
+        Get the joints, out of the given ones, that are normalized after
+        a joint whose tangent points moved and are one pipe away from them.
+        """
+        joints = set(joints)
+        followers = dict()
+        for point, joint in moved:
+            for oposite in self._connected_points(point):
+                other = self._tangent_joint(oposite)
+                if other is None or other in joints:
+                    continue
+
+                if self._order[other] > self._order[joint]:
+                    followers[other] = None
+
+        return list(followers)
+
+    def _update_control_status(self, point):
+        # Auto joints are moved by their corners, and their
+        # tangent points are controlled by the pipeline itself.
+        is_pipe_point = False
+        is_tangent_point = False
+        for structure in self._incidence.get(point, []):
+            if isinstance(structure, Bend | Elbow):
+                if (not structure.auto) or (structure.corner is point):
+                    self._control_mask[point.index] = True
+                    return
+                is_tangent_point = True
+
+            elif isinstance(structure, Pipe):
+                is_pipe_point = True
+
+        self._control_mask[point.index] = is_pipe_point and not is_tangent_point
+
+    def _add_point_row(self, point):
+        row = point.index
+        if row >= len(self._point_mask):
+            old_size = len(self._point_mask)
+            new_size = len(self.coordinates.data)
+            self._point_mask = np.resize(self._point_mask, new_size)
+            self._control_mask = np.resize(self._control_mask, new_size)
+            self._point_mask[old_size:] = False
+            self._control_mask[old_size:] = False
+
+        self._point_rows[row] = point
+        self._point_mask[row] = True
+
+    def _set_point_rows(self, added, removed):
+        # Bulk version of _add_point_row and _remove_point_row
+        if len(self._point_mask) < len(self.coordinates.data):
+            old_size = len(self._point_mask)
+            new_size = len(self.coordinates.data)
+            self._point_mask = np.resize(self._point_mask, new_size)
+            self._control_mask = np.resize(self._control_mask, new_size)
+            self._point_mask[old_size:] = False
+            self._control_mask[old_size:] = False
+
+        removed_rows = [point.index for point in removed]
+        for row in removed_rows:
+            self._point_rows.pop(row, None)
+        self._point_mask[removed_rows] = False
+        self._control_mask[removed_rows] = False
+
+        added_rows = [point.index for point in added]
+        self._point_rows.update(zip(added_rows, added))
+        self._point_mask[added_rows] = True
+
+    def _remove_point_row(self, point):
+        row = point.index
+        self._point_rows.pop(row, None)
+        self._point_mask[row] = False
+        self._control_mask[row] = False
 
     def _connected_points(self, point):
         oposite_points = []
-        for pipe in self.structures:
+        for pipe in self._incidence.get(point, []):
             if not isinstance(pipe, Pipe):
                 continue
 
-            if id(pipe.start) == id(point):
+            if pipe.start is point:
                 oposite_points.append(pipe.end)
 
-            elif id(pipe.end) == id(point):
+            elif pipe.end is point:
                 oposite_points.append(pipe.start)
 
         return oposite_points
 
+    def _tangent_joint(self, point):
+        for joint in self._incidence.get(point, []):
+            if not isinstance(joint, Bend | Elbow) or not joint.auto:
+                continue
+
+            if joint.start is point or joint.end is point:
+                return joint
+
+    def _auto_joints(self, structures):
+        joints = dict()
+        for structure in structures:
+            if isinstance(structure, Bend | Elbow) and structure.auto:
+                joints[structure] = None
+        return sorted(joints, key=self._order.__getitem__)
+
+    def _structures_around(self, points):
+        """
+        Get the structures whose geometry may depend on the given points,
+        that is, the ones touching them and the ones one pipe away.
+        """
+        region = dict()
+        for point in points:
+            region[point] = None
+            for structure in self._incidence.get(point, []):
+                region.update(dict.fromkeys(structure.get_points()))
+
+        for point in list(region):
+            region.update(dict.fromkeys(self._connected_points(point)))
+
+        structures = dict()
+        for point in region:
+            structures.update(dict.fromkeys(self._incidence.get(point, [])))
+        return list(structures)
+
+    def _point_indexes(self, points):
+        return np.fromiter((point.index for point in points), dtype=np.intp)
+
+    def _insert_structure(self, structure, order=None):
+        # Keep the tag of structures that already had one, like the ones
+        # being restored, unless it is already taken.
+        if structure.tag < 0 or structure.tag in self._structures:
+            structure.tag = self._next_tag
+
+        self._next_tag = max(self._next_tag, structure.tag + 1)
+        self._structures[structure.tag] = structure
+        # Restored structures get back their place in the order
+        if order is None:
+            order = self._insertions
+        self._insertions = max(self._insertions, order + 1)
+
+        self._order[structure] = order
+        self._index_structure(structure)
+
+    def _index_structure(self, structure):
+        # dict.fromkeys drops repeated points while keeping their order
+        for point in dict.fromkeys(structure.get_points()):
+            if point not in self._incidence:
+                point.set_store(self.coordinates)
+                self._add_point_row(point)
+
+            self._incidence.setdefault(point, []).append(structure)
+
+    def _unindex_structure(self, structure):
+        for point in dict.fromkeys(structure.get_points()):
+            incident = self._incidence.get(point)
+            if incident is None:
+                continue
+
+            incident[:] = [s for s in incident if s is not structure]
+            if incident:
+                self._update_control_status(point)
+            else:
+                del self._incidence[point]
+                self._remove_point_row(point)
+
     def __hash__(self) -> int:
         return id(self)
@@ -1,17 +1,28 @@
 from collections import defaultdict
+from contextlib import contextmanager
 from copy import deepcopy
 from dataclasses import dataclass, fields
 
 import numpy as np
 
 from opps.model import Bend, Elbow, Flange, Pipe, Pipeline, Point
+from opps.model.edit_history import (
+    AddStructure,
+    AddStructures,
+    EditHistory,
+    MergePoints,
+    MovePoint,
+    RemoveStructure,
+    SetAttribute,
+    SetDiameter,
+)
+from opps.model.spatial_hash import find_coincident_points
 from opps.model.structure import Structure
 
 
 class PipelineEditor:
     def __init__(self, pipeline: Pipeline):
         self.pipeline = pipeline
-        self.pipeline._update_points()
 
         self.deltas = np.array([0, 0, 0])
         self.anchor = self.pipeline.points[0]
@@ -22,9 +33,17 @@ class PipelineEditor:
         self.selected_structures = set()
         self.staged_structures = list()
 
+        # Points changed since the last update. Only the joints
+        # and flanges around them need to be solved again.
+        self.dirty_points = set()
+        self._batch_depth = 0
+        self._full_update_pending = False
+
+        self.history = EditHistory()
+
     def reset(self):
         # not the same as __init__
-        self.pipeline.structures.clear()
+        self.pipeline.clear()
         self.deltas = np.array([0, 0, 0])
         self.default_initial_diameter = 0.2
         self.default_final_diameter = 0.2
@@ -32,6 +51,22 @@ class PipelineEditor:
         self.selected_points.clear()
         self.selected_structures.clear()
         self.staged_structures.clear()
+        self.dirty_points.clear()
+        self._full_update_pending = False
+        self.history.clear()
+
+    def set_pipeline(self, pipeline: Pipeline):
+        """
+        Start editing another pipeline, like one that was just
+        opened, forgetting everything about the previous one.
+        """
+        self.clear_selection()
+        self.pipeline = pipeline
+        self.anchor = pipeline.points[0]
+        self.staged_structures.clear()
+        self.dirty_points.clear()
+        self._full_update_pending = False
+        self.history.clear()
 
     def set_anchor(self, point):
         self.anchor = point
@@ -39,10 +74,39 @@ class PipelineEditor:
     def set_deltas(self, deltas):
         self.deltas = np.array(deltas)
 
+    def mark_dirty(self, *objects):
+        for obj in objects:
+            if isinstance(obj, Point):
+                self.dirty_points.add(obj)
+            elif isinstance(obj, Structure):
+                self.dirty_points.update(obj.get_points())
+
+    @contextmanager
+    def batch(self):
+        """
+        Defer the updates until the end of the block, so
+        many changes are solved together in a single update.
+        If the block fails, the next update solves everything.
+        """
+
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            self._full_update_pending = True
+            raise
+        else:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.update()
+
     def add_structure(self, structure):
         structure.staged = True
         self.pipeline.add_structure(structure)
+        self.history.record(AddStructure(structure, self.pipeline.get_order(structure)))
         self.staged_structures.append(structure)
+        self.mark_dirty(structure)
         self.update()
         return structure
 
@@ -50,39 +114,93 @@ class PipelineEditor:
         if not isinstance(structure, Structure):
             return
 
+        order = self.pipeline.get_order(structure)
+        if order is None:
+            return
+
         if rejoin and isinstance(structure, Bend | Elbow):
+            for point in (structure.start, structure.end):
+                self.history.record(MovePoint(point, tuple(point), tuple(structure.corner)))
             structure.colapse()
 
+        self.mark_dirty(structure)
         self.pipeline.remove_structure(structure)
-
-    def merge_coincident_points(self):
-        found_points = dict()
-        for structure in self.pipeline.structures:
-            for point in structure.get_points():
-                x, y, z = np.round(point.coords(), 6)
-
-                if (x, y, z) in found_points:
-                    new = found_points[x, y, z]
-                    structure.replace_point(point, new)
-                else:
-                    found_points[x, y, z] = point
+        self.history.record(RemoveStructure(structure, order))
+
+    def merge_coincident_points(self, tolerance=1e-6):
+        points = self.pipeline.get_points()
+        coords = self.pipeline.coordinates.get_coords(points)
+        groups = find_coincident_points(coords, tolerance)
+
+        merged = np.flatnonzero(groups != np.arange(len(groups)))
+        replaced = {points[i]: points[j] for i, j in zip(merged.tolist(), groups[merged].tolist())}
+        if not replaced:
+            return replaced
+
+        # structures hash by a python method, ids are faster
+        structures = {
+            id(structure): structure
+            for old in replaced
+            for structure in self.pipeline.connected_structures(old)
+        }
+        structures = list(structures.values())
+
+        # Points of the same structure are kept apart, or a collapsed
+        # joint would become a single point that never opens again.
+        kept = set()
+        for structure in structures:
+            structure_points = structure.get_points()
+            merged_points = {id(replaced.get(point, point)) for point in structure_points}
+            if len(merged_points) < len(set(map(id, structure_points))):
+                kept.update(structure_points)
+
+        if kept:
+            replaced = {old: new for old, new in replaced.items() if old not in kept}
+            if not replaced:
+                return replaced
+            structures = {
+                id(structure): structure
+                for old in replaced
+                for structure in self.pipeline.connected_structures(old)
+            }
+            structures = list(structures.values())
+
+        # The whole merge is a single command, that is undone at once
+        old_points = [point for structure in structures for point in structure.get_points()]
+        self.pipeline.replace_points(replaced)
+        new_points = [point for structure in structures for point in structure.get_points()]
+
+        self.history.record(MergePoints(structures, old_points, new_points, len(replaced)))
+        self.mark_dirty(*replaced.values())
+        return replaced
 
     def remove_point(self, point, rejoin=True):
         if not isinstance(point, Point):
             return
 
-        structures_to_remove = []
-        for structure in self.pipeline.structures:
-            if point in structure.get_points():
-                structures_to_remove.append(structure)
-
-        for structure in structures_to_remove:
+        for structure in self.pipeline.connected_structures(point):
             self.remove_structure(structure, rejoin)
 
     def move_point(self, position):
-        if self.anchor not in self.pipeline.control_points:
+        if not self.pipeline.is_control_point(self.anchor):
             return
-        self.anchor.set_coords(*position)
+        self.set_point_coords(self.anchor, position)
+
+    def set_point_coords(self, point, coords):
+        self.history.record(MovePoint(point, tuple(point), tuple(coords)))
+        point.set_coords(*coords)
+        self.mark_dirty(point)
+
+    def set_attribute(self, structure, name, value):
+        self.history.record(SetAttribute(structure, name, getattr(structure, name), value))
+        setattr(structure, name, value)
+        self.mark_dirty(structure)
+
+    def set_diameter(self, structure, *diameters):
+        old_diameters = structure.get_diameters()
+        structure.set_diameter(*diameters)
+        new_diameters = structure.get_diameters()
+        self.history.record(SetDiameter(structure, old_diameters, new_diameters))
 
     def morph(self, structure, new_type):
         params = self._structure_params(structure)
@@ -90,32 +208,60 @@ class PipelineEditor:
 
         self.remove_structure(structure)
         self.pipeline.add_structure(new_structure)
+        self.history.record(AddStructure(new_structure, self.pipeline.get_order(new_structure)))
+        self.mark_dirty(new_structure)
         return new_structure
 
     def commit(self):
         self.update()
-        for structure in self.pipeline.structures:
+        for structure in self.staged_structures:
             structure.staged = False
         self.staged_structures.clear()
+        self.history.close_group()
 
     def dismiss(self):
         staged_points = []
+        with self.history.paused():
+            for structure in self.staged_structures:
+                staged_points.extend(structure.get_points())
+                self.remove_structure(structure)
+        self.history.forget_structures(self.staged_structures)
+        self.staged_structures.clear()
+        self.update()
+        self._fix_anchor(staged_points)
+
+    def undo(self):
+        if self.history.undo(self):
+            self._history_changed()
+
+    def redo(self):
+        if self.history.redo(self):
+            self._history_changed()
+
+    def _history_changed(self):
         for structure in self.staged_structures:
-            staged_points.extend(structure.get_points())
-            self.remove_structure(structure)
+            structure.staged = False
         self.staged_structures.clear()
+        self.clear_selection()
         self.update()
+        self._fix_anchor()
 
-        point_hashes = set(self.pipeline.points)
-        if self.anchor in point_hashes:
+    def _fix_anchor(self, candidates=()):
+        if self.pipeline.has_point(self.anchor):
             return
 
-        for point in staged_points:
-            if point in point_hashes:
+        for point in candidates:
+            if self.pipeline.has_point(point):
                 self.anchor = point
                 break
         else:
-            self.set_anchor(self.pipeline.control_points[-1])
+            # The last control point of the newest structure, since the rows
+            # of the store are reused. A pipeline left with only flanges has
+            # no control points, and an empty one only has the origin.
+            structures = sorted(self.pipeline.structures, key=self.pipeline.get_order)
+            points = [point for structure in structures for point in structure.get_points()]
+            control_points = [point for point in points if self.pipeline.is_control_point(point)]
+            self.set_anchor((control_points or points or self.pipeline.points)[-1])
 
     def change_diameter(self, initial_diameter, final_diameter):
         self.default_initial_diameter = initial_diameter
@@ -123,9 +269,8 @@ class PipelineEditor:
 
     def get_diameters_at_point(self):
         diameters = []
-        for structure in self.pipeline.structures:
-            if self.anchor in structure.get_points():
-                diameters.extend(structure.get_diameters())
+        for structure in self.pipeline.connected_structures(self.anchor):
+            diameters.extend(structure.get_diameters())
         return diameters
 
     # STRUCTURES
@@ -133,11 +278,14 @@ class PipelineEditor:
         if deltas != None:
             self.deltas = deltas
 
-        if self.anchor not in self.pipeline.control_points:
+        if not self.pipeline.is_control_point(self.anchor):
             return
 
+        return self._add_pipe()
+
+    def _add_pipe(self):
         current_point = self.anchor
-        next_point = Point(*(current_point.coords() + self.deltas))
+        next_point = Point(*(current_point.coords() + self.deltas), store=self.pipeline.coordinates)
 
         new_pipe = Pipe(current_point, next_point)
         new_pipe.set_diameter(self.default_initial_diameter, self.default_final_diameter)
@@ -152,20 +300,20 @@ class PipelineEditor:
         corner_point = deepcopy(start_point)
 
         # If a joint already exists morph it into a Bend
-        for joint in self.pipeline.structures:
+        for joint in self.pipeline.connected_structures(start_point):
             if not isinstance(joint, Bend | Elbow):
                 continue
-            if start_point in joint.get_points():
-                new_bend = self.morph(joint, Bend)
 
-                if not self.pipeline._connected_points(joint.start):
-                    self.anchor = joint.start
-                elif not self.pipeline._connected_points(joint.end):
-                    self.anchor = joint.end
-                else:
-                    self.anchor = joint.corner
+            new_bend = self.morph(joint, Bend)
+
+            if not self.pipeline._connected_points(joint.start):
+                self.anchor = joint.start
+            elif not self.pipeline._connected_points(joint.end):
+                self.anchor = joint.end
+            else:
+                self.anchor = joint.corner
 
-                return new_bend
+            return new_bend
 
         new_bend = Bend(start_point, end_point, corner_point, curvature_radius)
         new_bend.set_diameter(self.default_initial_diameter, self.default_final_diameter)
@@ -179,10 +327,10 @@ class PipelineEditor:
         corner_point = deepcopy(start_point)
 
         # If a joint already exists morph it into an Elbow
-        for joint in self.pipeline.structures:
+        for joint in self.pipeline.connected_structures(start_point):
             if not isinstance(joint, Bend | Elbow):
                 continue
-            if joint.corner == start_point:
+            if joint.corner is start_point:
                 new_elbow = self.morph(joint, Elbow)
             
                 if not self.pipeline._connected_points(joint.start):
@@ -202,17 +350,17 @@ class PipelineEditor:
 
     def add_flange(self):
         # If a flange already exists return it
-        for flange in self.pipeline.structures:
+        for flange in self.pipeline.connected_structures(self.anchor):
             if not isinstance(flange, Flange):
                 continue
-            if flange.position == self.anchor:
+            if flange.position is self.anchor:
                 return flange
 
         # It avoids the placement of a flange in the middle of a bend.
-        for joint in self.pipeline.structures:
+        for joint in self.pipeline.connected_structures(self.anchor):
             if not isinstance(joint, Bend | Elbow):
                 continue
-            if joint.corner == self.anchor:
+            if joint.corner is self.anchor:
                 new_flange = Flange(joint.start, normal=np.array([1, 0, 0]))
                 new_flange.set_diameter(self.default_initial_diameter)
                 self.add_structure(new_flange)
@@ -230,14 +378,81 @@ class PipelineEditor:
         if all(self.deltas == (0,0,0)):
             return
 
-        if self.anchor not in self.pipeline.control_points:
+        if not self.pipeline.is_control_point(self.anchor):
             return
 
-        # do not add a bend if the only avaliable point is the origin
-        if len(self.pipeline.points) > 1:
-            self.add_bend(curvature_radius)
+        # The bend and the pipe are solved together
+        with self.batch():
+            # do not add a bend if the only avaliable point is the origin
+            if self.pipeline.number_of_points() > 1:
+                self.add_bend(curvature_radius)
 
-        return self.add_pipe(deltas)
+            # The anchor may now be the free end of the bend, that is not
+            # a control point, but the pipe should be connected to it anyway.
+            return self._add_pipe()
+
+    def add_route(self, points, diameters=None, bend_radius=0.3):
+        """
+        Create the pipes and bends of a polyline all at once.
+
+        `diameters` may be a single value, one value per segment or one
+        (initial, final) pair per segment. `bend_radius` may be a single
+        value or one value per inner vertex, and inner vertices with a
+        radius that is not positive are joined without a bend.
+        """
+
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if len(points) < 2:
+            return []
+
+        number_of_segments = len(points) - 1
+        if diameters is None:
+            diameters = [(self.default_initial_diameter, self.default_final_diameter)]
+        diameters = np.asarray(diameters, dtype=float)
+        if diameters.ndim < 2:
+            diameters = diameters.reshape(-1, 1)
+        diameters = np.broadcast_to(diameters, (number_of_segments, 2))
+
+        radii = np.broadcast_to(np.asarray(bend_radius, dtype=float), (number_of_segments - 1,))
+        has_bend = np.concatenate(([False], radii > 0, [False]))
+
+        # Bent vertices need a start, an end and a corner,
+        # the other ones are a single point shared by the pipes.
+        counts = np.where(has_bend, 3, 1)
+        first_rows = np.cumsum(counts) - counts
+        store = self.pipeline.coordinates
+        rows = store.allocate_many(np.repeat(points, counts, axis=0))
+        route_points = [Point.from_index(store, row) for row in rows.tolist()]
+
+        if self.pipeline.has_point(self.anchor) and (self.anchor.coords() == points[0]).all():
+            route_points[0] = self.anchor
+
+        incoming = first_rows.tolist()
+        outgoing = (first_rows + has_bend).tolist()
+
+        structures = []
+        for i, (initial_diameter, final_diameter) in enumerate(diameters.tolist()):
+            if i > 0 and has_bend[i]:
+                start, end, corner = route_points[incoming[i] : incoming[i] + 3]
+                bend = Bend(start, end, corner, radii[i - 1])
+                bend.set_diameter(structures[-1].end_diameter, initial_diameter)
+                structures.append(bend)
+
+            pipe = Pipe(route_points[outgoing[i]], route_points[incoming[i + 1]])
+            pipe.set_diameter(initial_diameter, final_diameter)
+            structures.append(pipe)
+
+        for structure in structures:
+            structure.staged = True
+        self.pipeline.add_structures(structures)
+        orders = [self.pipeline.get_order(structure) for structure in structures]
+        self.history.record(AddStructures(structures, orders))
+        self.staged_structures.extend(structures)
+        self.mark_dirty(*structures)
+        self.update()
+
+        self.anchor = route_points[-1]
+        return structures
 
     # SELECTION
     def select_points(self, points, join=False, remove=False):
@@ -284,7 +499,7 @@ class PipelineEditor:
             structure.selected = True
 
     def clear_selection(self):
-        for structure in self.pipeline.structures:
+        for structure in self.selected_structures:
             structure.selected = False
         self.selected_points.clear()
         self.selected_structures.clear()
@@ -297,11 +512,32 @@ class PipelineEditor:
             self.remove_point(point, rejoin=False)
         
         self.clear_selection()
+        self._fix_anchor()
+        self.history.close_group()
+
+    def update(self, full=False):
+        if self._batch_depth:
+            self._full_update_pending |= full
+            return
+
+        # Finding the region around most of the points
+        # costs more than solving the whole pipeline.
+        if len(self.dirty_points) > self.pipeline.number_of_points() // 2:
+            full = True
+
+        if full or self._full_update_pending:
+            self.pipeline._update_curvatures()
+            self.pipeline._update_flanges()
+
+        elif self.dirty_points:
+            structures = self.pipeline._structures_around(self.dirty_points)
+            moved = self.pipeline._update_curvatures(structures)
+            if moved:
+                structures = self.pipeline._structures_around(self.dirty_points.union(moved))
+            self.pipeline._update_flanges(structures)
 
-    def update(self):
-        self.pipeline._update_curvatures()
-        self.pipeline._update_flanges()
-        self.pipeline._update_points()
+        self.dirty_points.clear()
+        self._full_update_pending = False
 
     def _structure_params(self, structure):
         """
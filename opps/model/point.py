@@ -1,26 +1,124 @@
-from dataclasses import dataclass
-
 import numpy as np
 
+from opps.model.coordinate_store import CoordinateStore, default_store
+
 
-@dataclass
 class Point:
-    x: float
-    y: float
-    z: float
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, x: float, y: float, z: float, store: CoordinateStore = None):
+        if store is None:
+            store = default_store
+
+        index = store.allocate((x, y, z))
+        self._store = store
+        self._index = index
+
+    @classmethod
+    def from_index(cls, store: CoordinateStore, index: int):
+        """
+        Create a point for a row that was already allocated in the store.
+        The point takes the ownership of the row.
+        """
+        point = cls.__new__(cls)
+        point._store = store
+        point._index = index
+        return point
+
+    @classmethod
+    def from_indexes(cls, store: CoordinateStore, indexes) -> list:
+        """
+        Bulk version of from_index, for a list of rows.
+        """
+        points = []
+        new = cls.__new__
+        for index in indexes:
+            point = new(cls)
+            point._store = store
+            point._index = index
+            points.append(point)
+        return points
+
+    @property
+    def x(self) -> float:
+        return self._store.data.item(self._index, 0)
+
+    @x.setter
+    def x(self, value):
+        self._store.data[self._index, 0] = value
+        self._store.versions[self._index] += 1
+
+    @property
+    def y(self) -> float:
+        return self._store.data.item(self._index, 1)
+
+    @y.setter
+    def y(self, value):
+        self._store.data[self._index, 1] = value
+        self._store.versions[self._index] += 1
+
+    @property
+    def z(self) -> float:
+        return self._store.data.item(self._index, 2)
 
-    def coords(self):
-        return np.array([self.x, self.y, self.z])
+    @z.setter
+    def z(self, value):
+        self._store.data[self._index, 2] = value
+        self._store.versions[self._index] += 1
+
+    @property
+    def store(self) -> CoordinateStore:
+        return self._store
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def version(self) -> int:
+        # Changes every time the coordinates are modified
+        return self._store.versions.item(self._index)
+
+    def coords(self) -> np.ndarray:
+        # This is a view into the store, copy it if you want to keep it.
+        return self._store.data[self._index]
 
     def set_coords(self, x, y, z):
-        self.x = x
-        self.y = y
-        self.z = z
+        self._store.data[self._index] = (x, y, z)
+        self._store.versions[self._index] += 1
+
+    def set_store(self, store: CoordinateStore):
+        if store is self._store:
+            return
+
+        index = store.allocate(self.coords())
+        store.versions[index] = self.version
+        self._store.release(self._index)
+        self._store = store
+        self._index = index
 
     def __iter__(self):
-        yield self.x
-        yield self.y
-        yield self.z
+        yield from self._store.data[self._index].tolist()
+
+    # identity hash, without the cost of calling a python method
+    __hash__ = object.__hash__
+
+    def __repr__(self) -> str:
+        return f"Point(x={self.x}, y={self.y}, z={self.z})"
+
+    def __copy__(self):
+        return Point(*self, store=self._store)
+
+    def __deepcopy__(self, memo):
+        point = Point(*self, store=self._store)
+        memo[id(self)] = point
+        return point
+
+    def __reduce__(self):
+        return (Point, tuple(self))
 
-    def __hash__(self) -> int:
-        return id(self)
+    def __del__(self):
+        # the slots may be empty if __init__ failed
+        store = getattr(self, "_store", None)
+        if store is not None:
+            store.release(self._index)
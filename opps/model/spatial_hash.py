@@ -0,0 +1,131 @@
+from itertools import product
+
+import numpy as np
+
+# Half of the 27 neighbour cells (plus the cell itself) is enough
+# to visit every pair of neighbour cells exactly once.
+_HALF_NEIGHBOURHOOD = np.array(
+    [offset for offset in product((-1, 0, 1), repeat=3) if offset >= (0, 0, 0)],
+    dtype=np.int64,
+)
+
+
+def find_coincident_points(coords, tolerance=1e-6):
+    """
+    Group the points that are closer than `tolerance` to each other.
+
+    The points are sorted into a grid of cells as wide as the tolerance, so
+    only points in the same or in neighbour cells need to be compared.
+    Groups are transitive, and each point is labeled with the smallest
+    index of its group.
+    """
+
+    if tolerance <= 0:
+        raise ValueError("The tolerance should be a positive number.")
+
+    coords = np.asarray(coords, dtype=np.float64)
+    labels = np.arange(len(coords))
+    if len(coords) < 2:
+        return labels
+
+    # Cells are keyed by the ranks of their integer coordinates among the
+    # occupied ones, that are exact and small enough to fit in an int64.
+    cells = np.floor(coords / tolerance).astype(np.int64)
+    xs, x = _dense_ranks(cells[:, 0])
+    ys, y = _dense_ranks(cells[:, 1])
+    zs, z = _dense_ranks(cells[:, 2])
+    xy = x * len(ys) + y
+
+    # Pairs of x and y are ranked again when there are so many
+    # occupied values that the product of the ranks would overflow.
+    xys = None
+    if len(xs) * len(ys) * len(zs) >= 2**62:
+        xys, xy = _dense_ranks(xy)
+    point_keys = xy * len(zs) + z
+
+    order = np.argsort(point_keys)
+    sorted_keys = point_keys[order]
+    cell_starts = np.flatnonzero(np.diff(sorted_keys, prepend=-1))
+    cell_keys = sorted_keys[cell_starts]
+    cell_sizes = np.diff(cell_starts, append=len(sorted_keys))
+    point_cells = np.repeat(np.arange(len(cell_starts)), cell_sizes)
+
+    cell_points = order[cell_starts]
+    cell_x, cell_y, cell_z = x[cell_points], y[cell_points], z[cell_points]
+
+    pairs_a = []
+    pairs_b = []
+    for dx, dy, dz in _HALF_NEIGHBOURHOOD:
+        # The next occupied value of an axis is the next rank,
+        # if it is really one cell away.
+        neighbour_x, x_exists = _shift(xs, cell_x, dx)
+        neighbour_y, y_exists = _shift(ys, cell_y, dy)
+        neighbour_z, z_exists = _shift(zs, cell_z, dz)
+        exists = x_exists & y_exists & z_exists
+
+        neighbour_xy = neighbour_x * len(ys) + neighbour_y
+        if xys is not None:
+            neighbour_xy, xy_exists = _rank(xys, neighbour_xy)
+            exists &= xy_exists
+        neighbour_keys = neighbour_xy * len(zs) + neighbour_z
+
+        neighbours = np.searchsorted(cell_keys, neighbour_keys)
+        neighbours[neighbours == len(cell_keys)] = 0
+        exists &= cell_keys[neighbours] == neighbour_keys
+
+        # pair every point with all the points of the neighbour cell
+        sources = np.flatnonzero(exists[point_cells])
+        targets = neighbours[point_cells[sources]]
+        sizes = cell_sizes[targets]
+        first_targets = np.repeat(cell_starts[targets], sizes)
+        shifts = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+        a = np.repeat(sources, sizes)
+        b = first_targets + shifts
+        if not (dx or dy or dz):
+            a, b = a[a < b], b[a < b]
+
+        pairs_a.append(order[a])
+        pairs_b.append(order[b])
+
+    a = np.concatenate(pairs_a)
+    b = np.concatenate(pairs_b)
+    close = np.sum((coords[a] - coords[b]) ** 2, axis=1) <= tolerance**2
+    return _connected_components(labels, a[close], b[close])
+
+
+def _dense_ranks(values):
+    """
+    Sorted unique values and the rank of every value among them.
+    """
+    order = np.argsort(values)
+    sorted_values = values[order]
+    is_first = np.diff(sorted_values, prepend=sorted_values[:1] - 1) != 0
+
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[order] = np.cumsum(is_first) - 1
+    return sorted_values[is_first], ranks
+
+
+def _shift(sorted_values, ranks, step):
+    if not step:
+        return ranks, True
+    shifted = np.clip(ranks + step, 0, len(sorted_values) - 1)
+    return shifted, sorted_values[shifted] == sorted_values[ranks] + step
+
+
+def _rank(sorted_values, values):
+    ranks = np.searchsorted(sorted_values, values)
+    ranks[ranks == len(sorted_values)] = 0
+    return ranks, sorted_values[ranks] == values
+
+
+def _connected_components(labels, a, b):
+    while True:
+        smallest = np.minimum(labels[a], labels[b])
+        np.minimum.at(labels, a, smallest)
+        np.minimum.at(labels, b, smallest)
+        labels = labels[labels]
+
+        if (labels[a] == labels[b]).all() and (labels[labels] == labels).all():
+            return labels
@@ -11,9 +11,19 @@ class Structure:
             self.__extra_info = dict()
         return self.__extra_info
 
+    def has_extra_info(self):
+        # without creating an empty dict for every structure
+        return bool(self.__extra_info)
+
     def get_points(self):
         raise NotImplementedError()
 
+    def set_points(self, points):
+        raise NotImplementedError()
+
+    def replace_point(self, old, new):
+        raise NotImplementedError()
+
     def as_vtk(self):
         raise NotImplementedError("vtk actor creation not implemented.")
 
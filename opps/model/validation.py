@@ -0,0 +1,341 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from opps.model.bend import Bend
+from opps.model.flange import Flange
+from opps.model.pipe import Pipe
+from opps.model.spatial_hash import find_coincident_points
+
+ERROR = "error"
+WARNING = "warning"
+
+
+@dataclass
+class ValidationIssue:
+    check: str
+    severity: str
+    message: str
+    structures: tuple = ()
+    position: tuple = None
+
+
+@dataclass
+class ValidationReport:
+    issues: list = field(default_factory=list)
+
+    @property
+    def errors(self):
+        return [issue for issue in self.issues if issue.severity == ERROR]
+
+    @property
+    def warnings(self):
+        return [issue for issue in self.issues if issue.severity == WARNING]
+
+    def is_valid(self):
+        return not self.errors
+
+    def count(self):
+        """
+        Number of issues found by every check.
+        """
+        counts = dict()
+        for issue in self.issues:
+            counts[issue.check] = counts.get(issue.check, 0) + 1
+        return counts
+
+
+class _Model:
+    """
+    Arrays with the rows of the points of every kind of structure, taken
+    from the coordinate store in a single pass over the pipeline.
+    """
+
+    def __init__(self, pipeline, tolerance):
+        self.coords = pipeline.coordinates.data
+
+        pipes = []
+        bends = []
+        flanges = []
+        for structure in pipeline.structures:
+            if isinstance(structure, Pipe):
+                pipes.append(structure)
+            elif isinstance(structure, Bend):
+                bends.append(structure)
+            elif isinstance(structure, Flange):
+                flanges.append(structure)
+
+        self.pipe_tags = np.array([pipe.tag for pipe in pipes], dtype=int)
+        self.pipe_rows = _rows(pipes, ("start", "end"))
+        self.pipe_diameters = _values(pipes, ("start_diameter", "end_diameter"))
+
+        self.bend_tags = np.array([bend.tag for bend in bends], dtype=int)
+        self.bend_rows = _rows(bends, ("start", "end", "corner"))
+        self.bend_diameters = _values(bends, ("start_diameter", "end_diameter"))
+        self.curvatures = _values(bends, ("curvature",)).ravel()
+        self.auto = np.array([bend.auto for bend in bends], dtype=bool)
+
+        self.flange_tags = np.array([flange.tag for flange in flanges], dtype=int)
+        self.flange_rows = _rows(flanges, ("position",)).ravel()
+        self.flange_diameters = _values(flanges, ("diameter",)).ravel()
+        normals = [flange.normal for flange in flanges]
+        self.flange_normals = np.array(normals, dtype=float).reshape(-1, 3)
+
+        size = len(self.coords)
+        # Other end of the pipe that touches each point
+        self.oposite = np.full(size, -1)
+        self.oposite[self.pipe_rows[:, 0]] = self.pipe_rows[:, 1]
+        self.oposite[self.pipe_rows[:, 1]] = self.pipe_rows[:, 0]
+
+        # Bend that has each point as a tangent point
+        self.tangent_bend = np.full(size, -1)
+        self.tangent_bend[self.bend_rows[:, 0]] = np.arange(len(bends))
+        self.tangent_bend[self.bend_rows[:, 1]] = np.arange(len(bends))
+
+        # Structures may touch each other by sharing a point or only by
+        # having points at the same place, like the ones read from pcf.
+        # The used rows and the far ends of the flanges, that go from the
+        # position against their normals, are mapped to nodes, that are
+        # indexes of the first of them at each place.
+        used = np.unique(
+            np.concatenate((self.pipe_rows.ravel(), self.bend_rows.ravel(), self.flange_rows))
+        )
+        far_ends = self.coords[self.flange_rows] - self.flange_normals
+        self.places = np.concatenate((self.coords[used], far_ends))
+        labels = find_coincident_points(self.places, tolerance)
+        self.nodes = np.full(size, -1)
+        self.nodes[used] = labels[: len(used)]
+        self.flange_far_nodes = labels[len(used) :]
+
+        # Number of pipe and bend ends and flange faces at each node
+        ends = np.concatenate((self.pipe_rows.ravel(), self.bend_rows[:, :2].ravel()))
+        faces = np.concatenate((self.nodes[self.flange_rows], self.flange_far_nodes))
+        self.connections = np.bincount(
+            np.concatenate((self.nodes[ends], faces)), minlength=len(self.places)
+        )
+
+
+def validate_pipeline(pipeline, tolerance=1e-6) -> ValidationReport:
+    """
+    Looks for problems that would make the exported model wrong. Every
+    check works over arrays with all the structures of a kind at once.
+    """
+    model = _Model(pipeline, tolerance)
+    report = ValidationReport()
+    _check_zero_length_pipes(model, report, tolerance)
+    _check_collapsed_bends(model, report, tolerance)
+    _check_bends_fit(model, report, tolerance)
+    _check_diameters(model, report, tolerance)
+    _check_flanges(model, report)
+    _check_open_ends(model, report)
+    return report
+
+
+def _check_zero_length_pipes(model, report, tolerance):
+    starts, ends = model.pipe_rows.T
+    lengths = np.linalg.norm(model.coords[ends] - model.coords[starts], axis=1)
+    for i in np.flatnonzero(lengths <= tolerance):
+        report.issues.append(
+            ValidationIssue(
+                "zero_length_pipe",
+                ERROR,
+                "Pipe has zero length.",
+                (int(model.pipe_tags[i]),),
+                _position(model, starts[i]),
+            )
+        )
+
+
+def _check_collapsed_bends(model, report, tolerance):
+    # Bends collapsed where the pipeline changes direction are
+    # skipped by the exporters, leaving a sharp corner.
+    starts, ends, corners = model.bend_rows.T
+    collapsed = (
+        np.linalg.norm(model.coords[starts] - model.coords[corners], axis=1) <= tolerance
+    ) & (np.linalg.norm(model.coords[ends] - model.coords[corners], axis=1) <= tolerance)
+
+    straight = np.zeros(len(starts), dtype=bool)
+    a, b = _directions(model)
+    known = ~np.isnan(a).any(axis=1) & ~np.isnan(b).any(axis=1)
+    straight[known] = np.sum(a[known] * b[known], axis=1) <= -1 + tolerance
+
+    for i in np.flatnonzero(collapsed & ~(model.auto & straight)):
+        report.issues.append(
+            ValidationIssue(
+                "collapsed_bend",
+                WARNING,
+                "Bend is collapsed into its corner and will not be exported.",
+                (int(model.bend_tags[i]),),
+                _position(model, corners[i]),
+            )
+        )
+
+
+def _check_bends_fit(model, report, tolerance):
+    # The automatic bends at both ends of a pipe share the space between
+    # their corners, and the one that doesn't fit is silently collapsed.
+    starts, ends, corners = model.bend_rows.T
+    a, b = _directions(model)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sin_angle = np.linalg.norm(a - b, axis=1) / 2
+        angle = np.arcsin(np.clip(sin_angle, 0, 1))
+        tangent_distances = np.cos(angle) * model.curvatures / np.sin(angle)
+    tangent_distances[~model.auto | ~np.isfinite(tangent_distances)] = 0
+
+    # Where the pipe would end if every bend was collapsed
+    positions = model.coords.copy()
+    positions[starts[model.auto]] = model.coords[corners[model.auto]]
+    positions[ends[model.auto]] = model.coords[corners[model.auto]]
+
+    needed = np.zeros(len(model.coords))
+    needed[starts] = tangent_distances
+    needed[ends] = tangent_distances
+
+    pipe_starts, pipe_ends = model.pipe_rows.T
+    available = np.linalg.norm(positions[pipe_ends] - positions[pipe_starts], axis=1)
+    required = needed[pipe_starts] + needed[pipe_ends]
+
+    for i in np.flatnonzero(required > available + tolerance):
+        bends = model.tangent_bend[[pipe_starts[i], pipe_ends[i]]]
+        tags = [int(model.pipe_tags[i])] + [int(model.bend_tags[j]) for j in bends if j >= 0]
+        report.issues.append(
+            ValidationIssue(
+                "bend_does_not_fit",
+                ERROR,
+                f"Bends need {required[i]:.6g} of a pipe with {available[i]:.6g} of length.",
+                tuple(tags),
+                _position(model, pipe_starts[i]),
+            )
+        )
+
+
+def _check_diameters(model, report, tolerance):
+    rows = np.concatenate(
+        (model.pipe_rows.ravel(), model.bend_rows[:, :2].ravel(), model.flange_rows)
+    )
+    nodes = np.concatenate((model.nodes[rows], model.flange_far_nodes))
+    diameters = np.concatenate(
+        (
+            model.pipe_diameters.ravel(),
+            model.bend_diameters.ravel(),
+            model.flange_diameters,
+            model.flange_diameters,
+        )
+    )
+    tags = np.concatenate(
+        (
+            np.repeat(model.pipe_tags, 2),
+            np.repeat(model.bend_tags, 2),
+            model.flange_tags,
+            model.flange_tags,
+        )
+    )
+    if not len(nodes):
+        return
+
+    order = np.argsort(nodes, kind="stable")
+    nodes = nodes[order]
+    diameters = diameters[order]
+    tags = tags[order]
+
+    first = np.flatnonzero(np.diff(nodes, prepend=-1))
+    last = np.append(first[1:], len(nodes))
+    smallest = np.minimum.reduceat(diameters, first)
+    largest = np.maximum.reduceat(diameters, first)
+    for i in np.flatnonzero(largest - smallest > tolerance):
+        # a flange touching the node by both faces is listed once
+        structures = tuple(dict.fromkeys(tags[first[i] : last[i]].tolist()))
+        report.issues.append(
+            ValidationIssue(
+                "diameter_mismatch",
+                WARNING,
+                f"Diameters from {smallest[i]:.6g} to {largest[i]:.6g} meet at the same point.",
+                structures,
+                tuple(model.places[nodes[first[i]]].tolist()),
+            )
+        )
+
+
+def _check_flanges(model, report):
+    # Flanges are usually next to components that are not read from pcf,
+    # like valves, so loose ones are only warned.
+    positions = model.nodes[model.flange_rows]
+    far_ends = model.flange_far_nodes
+    others = np.where(
+        positions == far_ends,
+        model.connections[positions] - 2,
+        model.connections[positions] + model.connections[far_ends] - 2,
+    )
+    for i in np.flatnonzero(others <= 0):
+        report.issues.append(
+            ValidationIssue(
+                "misplaced_flange",
+                WARNING,
+                "Flange is not connected to a pipe, bend or other flange.",
+                (int(model.flange_tags[i]),),
+                _position(model, model.flange_rows[i]),
+            )
+        )
+
+
+def _check_open_ends(model, report):
+    pipe_rows = model.pipe_rows.ravel()
+    pipe_tags = np.repeat(model.pipe_tags, 2)
+    bend_rows = model.bend_rows[:, :2].ravel()
+    bend_tags = np.repeat(model.bend_tags, 2)
+
+    rows = np.concatenate((pipe_rows, bend_rows))
+    tags = np.concatenate((pipe_tags, bend_tags))
+    for i in np.flatnonzero(model.connections[model.nodes[rows]] == 1):
+        report.issues.append(
+            ValidationIssue(
+                "open_end",
+                WARNING,
+                "End is not connected to anything.",
+                (int(tags[i]),),
+                _position(model, rows[i]),
+            )
+        )
+
+
+def _directions(model):
+    """
+    Unit vectors from the corner of every bend to the pipes it connects,
+    or nan if there is no pipe at that side.
+    """
+    starts, ends, corners = model.bend_rows.T
+    a = _pipe_directions(model, starts, corners)
+    b = _pipe_directions(model, ends, corners)
+    return a, b
+
+
+def _pipe_directions(model, tangent_points, corners):
+    oposite = model.oposite[tangent_points]
+    missing = oposite < 0
+
+    # The far end of the pipe may be the tangent point of another bend,
+    # that would be at its corner if it was collapsed.
+    targets = model.coords[oposite].copy()
+    other = model.tangent_bend[oposite]
+    has_other = (other >= 0) & ~missing
+    targets[has_other] = model.coords[model.bend_rows[other[has_other], 2]]
+
+    vectors = targets - model.coords[corners]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vectors /= np.linalg.norm(vectors, axis=1)[:, None]
+    vectors[missing] = np.nan
+    return vectors
+
+
+def _rows(structures, names):
+    rows = [getattr(structure, name).index for structure in structures for name in names]
+    return np.array(rows, dtype=int).reshape(-1, len(names))
+
+
+def _values(structures, names):
+    values = [getattr(structure, name) for structure in structures for name in names]
+    return np.array(values, dtype=float).reshape(-1, len(names))
+
+
+def _position(model, row):
+    return tuple(model.coords[row].tolist())
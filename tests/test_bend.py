@@ -0,0 +1,34 @@
+import numpy as np
+
+from opps.model import Bend, Point
+
+
+def right_bend(curvature=1):
+    return Bend(Point(1, 0, 0), Point(0, 1, 0), Point(0, 0, 0), curvature)
+
+
+def test_center_is_cached_until_something_changes():
+    bend = right_bend()
+    center = bend.center
+    assert np.allclose(center.coords(), (1, 1, 0))
+    assert bend.center is center
+    assert np.isclose(bend.arc_angle, np.pi / 2)
+
+    bend.start.set_coords(2, 0, 0)
+    assert bend.center is not center
+    assert np.allclose(bend.center.coords(), (1, 1, 0))
+
+    bend.curvature = 2
+    assert np.allclose(bend.center.coords(), (2, 2, 0))
+    assert np.isclose(bend.arc_length, np.pi)
+    assert np.isclose(bend.tangent_distance, 2)
+
+
+def test_center_follows_replaced_points():
+    bend = right_bend()
+    center = bend.center
+
+    # a new point with the same version as the old one
+    bend.replace_point(bend.end, Point(0, -1, 0))
+    assert bend.center is not center
+    assert np.allclose(bend.center.coords(), (1, -1, 0))
@@ -0,0 +1,27 @@
+import pytest
+
+gmsh = pytest.importorskip("gmsh")
+
+from opps.io.cad_file.cad_handler import CADHandler
+from opps.io.cad_file.gmsh_session import gmsh_model
+from opps.model import Pipeline
+from opps.model.pipeline_editor import PipelineEditor
+
+
+def test_structures_share_their_vertices():
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    editor.add_route([(0, 0, 0), (1, 0, 0), (1, 1, 0), (1, 1, 1)], bend_radius=0.2)
+    editor.commit()
+    editor.update()
+
+    with gmsh_model() as model:
+        CADHandler().add_entities(pipeline)
+        model.occ.synchronize()
+
+        # the ends of the 3 pipes and 2 bends, and the centers of the bends
+        assert len(model.get_entities(1)) == 5
+        assert len(model.get_entities(0)) == 6 + 2
+
+        for _, tag in model.get_entities(1):
+            assert len(model.get_boundary([(1, tag)], oriented=False)) == 2
@@ -0,0 +1,30 @@
+import shutil
+from pathlib import Path
+
+from opps.cli import convert, validate
+
+EXAMPLES = Path(__file__).parents[1] / "data" / "example_files" / "pcf"
+
+
+def test_files_in_the_target_format_are_skipped(tmp_path):
+    shutil.copy(EXAMPLES / "teste.pcf", tmp_path / "a.pcf")
+
+    assert convert([str(tmp_path)], "opps", jobs=1) == 0
+    assert convert([str(tmp_path)], "opps", jobs=1) == 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.opps", "a.pcf"]
+
+    (tmp_path / "a.pcf").unlink()
+    assert convert([str(tmp_path)], "opps", jobs=1) == 1
+
+
+def test_same_destination_is_rejected(tmp_path, capsys):
+    shutil.copy(EXAMPLES / "teste.pcf", tmp_path / "a.pcf")
+    shutil.copy(EXAMPLES / "teste.pcf", tmp_path / "a.PCF")
+
+    assert convert([str(tmp_path)], "opps", jobs=1) == 1
+    assert "same destination" in capsys.readouterr().err
+    assert not (tmp_path / "a.opps").exists()
+
+
+def test_example_files_are_valid():
+    assert validate([str(EXAMPLES)], jobs=1) == 0
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import pytest
+
+from opps.io.conversion import load_pipeline, save_pipeline
+
+EXAMPLES = Path(__file__).parents[1] / "data" / "example_files" / "pcf"
+
+
+class Cancelled(Exception):
+    pass
+
+
+def test_progress_is_reported():
+    fractions = []
+    pipeline = load_pipeline(EXAMPLES / "teste.pcf", progress=fractions.append)
+    assert fractions and fractions[-1] == 1
+    assert fractions == sorted(fractions)
+    assert len(pipeline.structures)
+
+
+def test_cancelled_save_keeps_the_old_file(tmp_path):
+    pipeline = load_pipeline(EXAMPLES / "teste.pcf")
+    path = tmp_path / "pipeline.pcf"
+    path.write_text("old")
+
+    def cancel(fraction):
+        raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        save_pipeline(pipeline, path, progress=cancel)
+    assert path.read_text() == "old"
+    assert [path.name for path in tmp_path.iterdir()] == ["pipeline.pcf"]
+
+    save_pipeline(pipeline, path)
+    assert len(load_pipeline(path).structures) == len(pipeline.structures)
+
+
+def test_file_task_signals():
+    pytest.importorskip("PyQt5")
+    from opps.interface.file_task import FileTask
+
+    def run(task):
+        events = []
+        task.signals.progress.connect(lambda value: events.append(("progress", value)))
+        task.signals.finished.connect(lambda result: events.append(("finished", result)))
+        task.signals.failed.connect(lambda message: events.append(("failed", message)))
+        task.signals.cancelled.connect(lambda: events.append(("cancelled",)))
+        task.run()
+        return events
+
+    def work(value, progress):
+        progress(0.5)
+        return value
+
+    assert run(FileTask(work, 7)) == [("progress", 50), ("finished", 7)]
+
+    task = FileTask(work, 7)
+    task.cancel()
+    assert run(task) == [("cancelled",)]
+
+    def fail(progress):
+        raise ValueError("bad file")
+
+    assert run(FileTask(fail)) == [("failed", "ValueError: bad file")]
@@ -0,0 +1,86 @@
+import gc
+from copy import copy
+
+import numpy as np
+import pytest
+
+from opps.model import Pipeline, Point
+from opps.model.coordinate_store import CoordinateStore
+from opps.model.pipeline_editor import PipelineEditor
+
+
+def test_released_rows_are_reused():
+    store = CoordinateStore(capacity=2)
+    points = [Point(i, 0, 0, store=store) for i in range(5)]
+    assert len(store) == 5
+    assert [point.index for point in points] == list(range(5))
+
+    row = points[1].index
+    del points[1]
+    gc.collect()
+    assert len(store) == 4
+
+    point = Point(7, 8, 9, store=store)
+    assert point.index == row
+    assert list(point) == [7, 8, 9]
+    assert [p.x for p in points] == [0, 2, 3, 4]
+
+    rows = store.allocate_many(np.ones((3, 3)))
+    assert len(set(rows.tolist())) == 3 and 5 <= rows.min()
+    assert np.all(store.data[rows] == 1)
+
+
+def test_growth_keeps_the_coordinates_and_versions():
+    store = CoordinateStore(capacity=1)
+    point = Point(1, 2, 3, store=store)
+    point.set_coords(4, 5, 6)
+    others = [Point(i, i, i, store=store) for i in range(100)]
+
+    assert list(point) == [4, 5, 6]
+    assert point.version == 1
+    assert np.all(store.get_coords(others)[:, 0] == np.arange(100))
+
+
+def test_points_move_between_stores():
+    first = CoordinateStore()
+    second = CoordinateStore()
+    point = Point(1, 2, 3, store=first)
+    point.x = 10
+
+    point.set_store(second)
+    assert point.store is second
+    assert list(point) == [10, 2, 3]
+    assert point.version == 1
+    assert len(first) == 0 and len(second) == 1
+
+    # a copy has its own row
+    other = copy(point)
+    other.y = 20
+    assert other.index != point.index
+    assert list(point) == [10, 2, 3]
+
+
+def test_editor_keeps_a_copy_of_the_anchor_coordinates(monkeypatch):
+    pytest.importorskip("PyQt5")
+    pytest.importorskip("vtkat")
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    from opps.interface.viewer_3d.render_widgets.editor_render_widget import (
+        EditorRenderWidget,
+    )
+
+    application = QApplication.instance() or QApplication([])
+    editor = PipelineEditor(Pipeline())
+    editor.add_bent_pipe((1, 0, 0))
+    editor.commit()
+    widget = EditorRenderWidget(editor)
+
+    point = editor.pipeline.control_points[-1]
+    widget.change_anchor(point)
+    coords = point.coords().copy()
+    point.set_coords(5, 5, 5)
+    # many new points make the store grow into another buffer
+    [Point(0, 0, 0, store=editor.pipeline.coordinates) for _ in range(1000)]
+    assert np.all(widget.coords == coords)
+    widget.close()
@@ -0,0 +1,177 @@
+import numpy as np
+
+from opps.model import Bend, Elbow, Flange, Pipe, Pipeline
+from opps.model.pipeline_editor import PipelineEditor
+from tests.test_pipeline_editor import separate_pipes
+
+
+def snapshot(pipeline):
+    # points are numbered in the order they are first seen, so
+    # the snapshot only tells which structures share them
+    points = dict()
+    structures = []
+    for structure in sorted(pipeline.structures, key=lambda structure: structure.tag):
+        structure_points = structure.get_points()
+        coords = pipeline.coordinates.get_coords(structure_points).round(9).tolist()
+        structures.append(
+            (
+                type(structure).__name__,
+                structure.tag,
+                [points.setdefault(point, len(points)) for point in structure_points],
+                coords,
+                structure.get_diameters(),
+                getattr(structure, "curvature", None),
+                np.round(getattr(structure, "normal", ()), 9).tolist(),
+            )
+        )
+    return structures, pipeline.number_of_points()
+
+
+def edits(editor):
+    # every step is a group of the history
+    pipeline = editor.pipeline
+    rng = np.random.default_rng(3)
+    vertices = np.cumsum(rng.uniform(-1, 1, (20, 3)), axis=0)
+
+    editor.add_route(vertices, bend_radius=0.3)
+    editor.commit()
+    yield
+
+    editor.add_flange()
+    editor.commit()
+    yield
+
+    point = pipeline.get_point(pipeline.control_point_rows()[5])
+    editor.set_point_coords(point, point.coords() + 0.5)
+    editor.set_point_coords(point, point.coords() + 0.5)
+    editor.commit()
+    yield
+
+    bends = [structure for structure in pipeline.structures if isinstance(structure, Bend)]
+    editor.set_attribute(bends[3], "curvature", 0.1)
+    editor.commit()
+    yield
+
+    pipes = [structure for structure in pipeline.structures if isinstance(structure, Pipe)]
+    editor.set_diameter(pipes[4], 0.3, 0.4)
+    editor.commit()
+    yield
+
+    editor.morph(bends[6], Elbow)
+    editor.commit()
+    yield
+
+    editor.select_structures([pipes[10], bends[12]])
+    editor.delete_selection()
+    editor.update()
+    yield
+
+    for pipe in separate_pipes(pipeline, 5):
+        editor.add_structure(pipe)
+    editor.commit()
+    yield
+
+    editor.merge_coincident_points()
+    editor.commit()
+    yield
+
+
+def test_undo_and_redo_every_edit():
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    states = [snapshot(pipeline)]
+    for _ in edits(editor):
+        states.append(snapshot(pipeline))
+    assert len(set(map(str, states))) == len(states)
+
+    for state in reversed(states[:-1]):
+        editor.undo()
+        assert snapshot(pipeline) == state
+    assert not editor.history.can_undo()
+
+    for state in states[1:]:
+        editor.redo()
+        assert snapshot(pipeline) == state
+    assert not editor.history.can_redo()
+
+
+def test_new_edit_clears_redo():
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    editor.add_bent_pipe((1, 0, 0))
+    editor.commit()
+    editor.add_bent_pipe((0, 1, 0))
+    editor.commit()
+
+    editor.undo()
+    assert editor.history.can_redo()
+    editor.add_flange()
+    editor.commit()
+    assert not editor.history.can_redo()
+    assert [type(s) for s in pipeline.structures] == [Pipe, Flange]
+
+
+def test_oldest_edits_are_forgotten_over_budget():
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    editor.history.memory_budget = 4000
+    for _ in range(20):
+        editor.add_bent_pipe((1, 0, 0))
+        editor.commit()
+
+    assert editor.history.memory <= 4000
+    undone = 0
+    while editor.history.can_undo():
+        editor.undo()
+        undone += 1
+    assert 0 < undone < 20
+
+
+def test_newest_edit_is_kept_over_budget():
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    editor.add_bent_pipe((1, 0, 0))
+    editor.commit()
+
+    editor.history.memory_budget = 1000
+    pipes = separate_pipes(pipeline, 50)
+    for pipe in pipes:
+        editor.add_structure(pipe)
+    editor.commit()
+    editor.select_structures(pipes)
+    editor.delete_selection()
+
+    # the removed pipes are bigger than the budget by themselves
+    assert editor.history.memory > editor.history.memory_budget
+    editor.undo()
+    assert len(pipeline.structures) == 51
+    assert not editor.history.can_undo()
+
+
+def test_large_route_is_undone():
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    vertices = np.cumsum(np.random.default_rng(6).uniform(-1, 1, (12_000, 3)), axis=0)
+    editor.add_route(vertices, bend_radius=0.1)
+    editor.commit()
+    before = snapshot(pipeline)
+    assert editor.history.memory < 2**20
+
+    editor.undo()
+    assert not pipeline.structures
+    editor.redo()
+    assert snapshot(pipeline) == before
+
+
+def test_dismissed_route_is_forgotten():
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    editor.add_bent_pipe((1, 0, 0))
+    editor.commit()
+
+    editor.add_route([(1, 0, 0), (1, 1, 0), (1, 1, 1)])
+    editor.dismiss()
+    assert len(pipeline.structures) == 1
+
+    editor.undo()
+    assert not pipeline.structures
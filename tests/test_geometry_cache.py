@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("vtkat")
+
+from opps.interface.viewer_3d.actors.geometry_cache import GeometryCache
+from opps.model import Pipe, Point
+
+
+def pipes(n):
+    return [Pipe(Point(i, 0, 0), Point(i + 1, 0, 0)) for i in range(n)]
+
+
+def test_same_geometry_is_tessellated_once():
+    cache = GeometryCache()
+    pipe, other = pipes(2)
+    data = cache.get(pipe)
+    assert cache.get(pipe) is data
+
+    # the color is not part of the geometry
+    pipe.color = (1, 2, 3)
+    assert cache.get(pipe) is data
+
+    assert cache.get(other) is not data
+    pipe.end.set_coords(5, 0, 0)
+    assert cache.get(pipe) is not data
+    assert len(cache) == 3
+
+
+def test_least_recently_used_are_evicted():
+    first, second, third = pipes(3)
+    cache = GeometryCache()
+    first_data = cache.get(first)
+    size = cache.used_bytes
+    cache.max_bytes = 2 * size
+    cache.get(second)
+
+    # the first one was used again, so the second one goes
+    cache.get(first)
+    cache.get(third)
+    assert len(cache) == 2
+    assert cache.used_bytes == 2 * size
+    assert cache.get(first) is first_data
+
+    # the newest one is kept even if it is too big
+    cache.max_bytes = 0
+    cache.get(second)
+    assert len(cache) == 1
+    assert cache.used_bytes == size
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+gmsh = pytest.importorskip("gmsh")
+
+from opps.io.cad_file.gmsh_session import gmsh_model
+
+
+def add_points(n):
+    with gmsh_model() as model:
+        for i in range(n):
+            model.occ.add_point(i, 0, 0)
+        model.occ.synchronize()
+        name = model.getCurrent()
+        return name, len(model.get_entities(0))
+
+
+def test_models_are_isolated():
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(add_points, range(1, 9)))
+
+    names = [name for name, _ in results]
+    assert len(set(names)) == len(names)
+    # each operation only sees its own points
+    assert [n for _, n in results] == list(range(1, 9))
+
+
+def test_models_are_removed():
+    name, _ = add_points(3)
+    assert name not in gmsh.model.list()
+
+    with pytest.raises(RuntimeError):
+        with gmsh_model() as model:
+            name = model.getCurrent()
+            raise RuntimeError()
+    assert name not in gmsh.model.list()
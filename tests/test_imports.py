@@ -0,0 +1,31 @@
+import json
+import subprocess
+import sys
+
+# The command line and the file formats must not load the interface
+MODULES = ("opps.model", "opps.io.pcf", "opps.io.conversion", "opps.cli")
+HEAVY = ("vtk", "vtkmodules", "PyQt5", "gmsh")
+
+SCRIPT = f"""
+import json, sys
+from importlib import import_module
+from time import perf_counter
+
+start = perf_counter()
+for name in {MODULES!r}:
+    import_module(name)
+elapsed = perf_counter() - start
+
+loaded = sorted(name for name in sys.modules if name.split(".")[0] in {HEAVY!r})
+print(json.dumps([elapsed, loaded]))
+"""
+
+
+def test_no_heavy_modules_are_imported():
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT], capture_output=True, text=True, check=True
+    ).stdout
+    elapsed, loaded = json.loads(output)
+
+    assert loaded == []
+    assert elapsed < 2
@@ -0,0 +1,36 @@
+import numpy as np
+
+from opps.model import Flange, Pipeline
+from opps.model.pipeline_editor import PipelineEditor
+
+
+def geometry(pipeline):
+    coords = pipeline.coordinates.get_coords(pipeline.get_points())
+    flanges = [s for s in pipeline.structures if isinstance(s, Flange)]
+    normals = np.array([flange.normal for flange in flanges], dtype=float)
+    return coords, normals
+
+
+def test_same_as_full_update():
+    rng = np.random.default_rng(2)
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    vertices = np.cumsum(rng.uniform(-1, 1, (100, 3)), axis=0)
+    editor.add_route(vertices, bend_radius=rng.uniform(0.1, 1.5, 98))
+    editor.add_flange()
+    editor.commit()
+
+    control_points = [pipeline.get_point(row) for row in pipeline.control_point_rows()]
+    for _ in range(200):
+        point = control_points[rng.integers(len(control_points))]
+        editor.set_point_coords(point, point.coords() + rng.normal(0, 0.5, 3))
+        editor.update()
+        assert not editor.dirty_points
+        coords, normals = geometry(pipeline)
+
+        pipeline._update_curvatures()
+        pipeline._update_flanges()
+        full_coords, full_normals = geometry(pipeline)
+        # joints solved in batches of other sizes may round differently
+        assert np.allclose(coords, full_coords, rtol=0, atol=1e-12)
+        assert np.allclose(normals, full_normals, rtol=0, atol=1e-12)
@@ -0,0 +1,79 @@
+import numpy as np
+
+from opps.model import Bend, Pipeline, Point
+from opps.model.coordinate_store import CoordinateStore
+from opps.model.joint_solver import solve_joints
+from opps.model.pipeline_editor import PipelineEditor
+
+
+def random_joints(rng, n):
+    corners = rng.normal(0, 1, (n, 3))
+    a_points = corners + rng.normal(0, 1, (n, 3))
+    b_points = corners + rng.normal(0, 1, (n, 3))
+    curvatures = rng.uniform(0.05, 1, n)
+
+    # joints that can't be normalized, and must colapse
+    a_points[0] = corners[0]
+    b_points[1] = corners[1]
+    b_points[2] = a_points[2]
+    b_points[3] = corners[3] + 2 * (a_points[3] - corners[3])
+    curvatures[4] = 100
+    return corners, a_points, b_points, curvatures
+
+
+def test_same_as_normalize_values():
+    rng = np.random.default_rng(0)
+    corners, a_points, b_points, curvatures = random_joints(rng, 200)
+    starts, ends, solved = solve_joints(corners, a_points, b_points, curvatures)
+
+    store = CoordinateStore()
+    for i in range(len(corners)):
+        start, end, corner, a, b = (
+            Point(*coords, store=store)
+            for coords in (corners[i], corners[i], corners[i], a_points[i], b_points[i])
+        )
+        Bend(start, end, corner, curvatures[i]).normalize_values(a, b)
+
+        assert np.allclose(start.coords(), starts[i])
+        assert np.allclose(end.coords(), ends[i])
+        assert solved[i] == (start.coords() != corner.coords()).any()
+
+    assert not solved[:5].any()
+    assert solved.sum() > 100
+
+
+def one_by_one(pipeline):
+    # Pipeline._update_curvatures before the joints were solved in batches
+    joints = [joint for joint in pipeline.structures if isinstance(joint, Bend) and joint.auto]
+    for joint in joints:
+        joint.colapse()
+
+    for joint in joints:
+        connected_points = (
+            pipeline._connected_points(joint.start)
+            + pipeline._connected_points(joint.end)
+            + pipeline._connected_points(joint.corner)
+        )
+        if len(connected_points) != 2:
+            continue
+
+        oposite_a, oposite_b, *_ = connected_points
+        joint.normalize_values(oposite_a, oposite_b)
+
+
+def test_pipeline_same_as_one_by_one():
+    # Short segments and large radii, so many joints take the room of the
+    # joints after them and can only be solved in order.
+    rng = np.random.default_rng(1)
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    vertices = np.cumsum(rng.uniform(-1, 1, (300, 3)), axis=0)
+    editor.add_route(vertices, bend_radius=rng.uniform(0.1, 1.5, 298))
+    editor.commit()
+
+    pipeline._update_curvatures()
+    batched = pipeline.coordinates.get_coords(pipeline.get_points())
+
+    one_by_one(pipeline)
+    reference = pipeline.coordinates.get_coords(pipeline.get_points())
+    assert np.allclose(batched, reference)
@@ -0,0 +1,86 @@
+from opps.io.neutral_file.journal import Journal
+from opps.model import Bend, Elbow, Pipeline
+from opps.model.pipeline_editor import PipelineEditor
+from tests.test_edit_history import edits, snapshot
+
+
+def test_recovered_after_every_flush(tmp_path):
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    journal = Journal(tmp_path / "autosave.opps", pipeline)
+    journal.watch(editor.history)
+
+    states = 0
+    for _ in edits(editor):
+        journal.flush()
+        states += 1
+        assert snapshot(Journal.recover(journal.path)) == snapshot(pipeline)
+
+    for _ in range(states // 2):
+        editor.undo()
+        journal.flush()
+        assert snapshot(Journal.recover(journal.path)) == snapshot(pipeline)
+
+    editor.redo()
+    journal.flush()
+    assert snapshot(Journal.recover(journal.path)) == snapshot(pipeline)
+
+
+def test_compacted_journal(tmp_path):
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    journal = Journal(tmp_path / "autosave.opps", pipeline, minimum_compaction=0)
+    journal.watch(editor.history)
+
+    compactions = 0
+    for _ in edits(editor):
+        journal.flush()
+        compactions += journal.journal_path.stat().st_size == 0
+        assert snapshot(Journal.recover(journal.path)) == snapshot(pipeline)
+    assert compactions
+
+
+def test_interrupted_flush_is_ignored(tmp_path):
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    journal = Journal(tmp_path / "autosave.opps", pipeline)
+    journal.watch(editor.history)
+
+    editor.add_bent_pipe((1, 0, 0))
+    editor.commit()
+    journal.flush()
+    expected = snapshot(pipeline)
+
+    editor.add_bent_pipe((0, 1, 0))
+    editor.commit()
+    journal.flush()
+    journal.close()
+
+    # the crash happened in the middle of the last flush
+    lines = journal.journal_path.read_text().splitlines(keepends=True)
+    last_flush = lines.index('["c"]\n') + 1
+    journal.journal_path.write_text("".join(lines[: last_flush + 2]) + '["p", 7, 0.5')
+
+    assert snapshot(Journal.recover(journal.path)) == expected
+
+
+def test_edits_not_committed_are_flushed(tmp_path):
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    journal = Journal(tmp_path / "autosave.opps", pipeline)
+    journal.watch(editor.history)
+    editor.add_route([(0, 0, 0), (1, 0, 0), (1, 1, 0), (2, 1, 0)])
+    editor.commit()
+    journal.flush()
+
+    # like the edit widgets, that never close the group
+    bend = next(structure for structure in pipeline.structures if isinstance(structure, Bend))
+    editor.set_attribute(bend, "curvature", 0.2)
+    editor.set_diameter(bend, 0.3, 0.3)
+    editor.morph(bend, Elbow)
+    point = pipeline.get_point(pipeline.control_point_rows()[0])
+    editor.set_point_coords(point, (0, -1, 0))
+    editor.update()
+    journal.flush()
+
+    assert snapshot(Journal.recover(journal.path)) == snapshot(pipeline)
@@ -0,0 +1,124 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from opps.io.conversion import load_pipeline, save_pipeline
+from opps.io.opps_file.opps_handler import OPPSHandler
+from opps.io.pcf.pcf_exporter import PCFExporter
+from opps.model import Bend, Elbow, Flange, Pipeline, Point
+from opps.model.pipeline_editor import PipelineEditor
+
+EXAMPLES = Path(__file__).parents[1] / "data" / "example_files" / "pcf"
+
+
+def described(pipeline):
+    # everything the format keeps, with the points numbered by first use
+    points = dict()
+    description = []
+    for structure in sorted(pipeline.structures, key=pipeline.get_order):
+        structure_points = structure.get_points()
+        description.append(
+            (
+                type(structure),
+                structure.tag,
+                [points.setdefault(point, len(points)) for point in structure_points],
+                pipeline.coordinates.get_coords(structure_points).tolist(),
+                structure.get_diameters(),
+                getattr(structure, "curvature", None),
+                np.asarray(getattr(structure, "normal", ())).tolist(),
+                getattr(structure, "auto", None),
+                tuple(structure.color),
+                structure.extra_info,
+            )
+        )
+    return description
+
+
+def test_everything_is_kept(tmp_path):
+    rng = np.random.default_rng(5)
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    editor.add_route(np.cumsum(rng.uniform(-1, 1, (30, 3)), axis=0), bend_radius=0.2)
+    editor.add_flange()
+    editor.commit()
+
+    bends = [structure for structure in pipeline.structures if isinstance(structure, Bend)]
+    editor.morph(bends[2], Elbow)
+    bends[5].auto = False
+    bends[6].color = (1, 2, 3)
+    bends[7].extra_info["material"] = "steel"
+    flange = next(structure for structure in pipeline.structures if isinstance(structure, Flange))
+    flange.auto = False
+    editor.select_structures([bends[10]])
+    editor.delete_selection()
+    editor.update(full=True)
+
+    path = tmp_path / "pipeline.opps"
+    save_pipeline(pipeline, path)
+    loaded = load_pipeline(path)
+    assert described(loaded) == described(pipeline)
+    assert not (tmp_path / "pipeline.partial.opps").exists()
+
+
+@pytest.mark.parametrize("path", sorted(EXAMPLES.glob("*.pcf")), ids=lambda path: path.name)
+def test_example_files_export_the_same_after_a_round_trip(path, tmp_path):
+    pipeline = load_pipeline(path)
+    save_pipeline(pipeline, tmp_path / "pipeline.opps")
+    loaded = load_pipeline(tmp_path / "pipeline.opps")
+    assert PCFExporter().encoder(loaded) == PCFExporter().encoder(pipeline)
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "pipeline.opps"
+    path.write_bytes(b"ISOGEN-FILES            ISOGEN.FLS\n")
+    with pytest.raises(ValueError):
+        OPPSHandler().load(path, Pipeline())
+
+
+def indexes(pipeline):
+    # the indexes of the pipeline, with points and structures by their rows and tags
+    incidence = {
+        point.index: [structure.tag for structure in structures]
+        for point, structures in pipeline._incidence.items()
+    }
+    orders = {structure.tag: pipeline.get_order(structure) for structure in pipeline.structures}
+    return (
+        incidence,
+        pipeline.point_rows().tolist(),
+        pipeline.control_point_rows().tolist(),
+        orders,
+        pipeline._next_tag,
+        pipeline._insertions,
+    )
+
+
+def test_structures_are_indexed_in_bulk(tmp_path):
+    rng = np.random.default_rng(7)
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    editor.add_route(np.cumsum(rng.uniform(-1, 1, (20, 3)), axis=0), bend_radius=0.2)
+    editor.add_flange()
+    editor.commit()
+
+    bends = [structure for structure in pipeline.structures if isinstance(structure, Bend)]
+    editor.morph(bends[1], Elbow)
+    bends[3].auto = False
+    editor.select_structures([bends[5]])
+    editor.delete_selection()
+    # a point used twice by the same structure
+    start = Point(9, 9, 9, store=pipeline.coordinates)
+    pipeline.add_structure(Bend(start, start, Point(9, 9, 8, store=pipeline.coordinates), 0.1))
+
+    path = tmp_path / "pipeline.opps"
+    handler = OPPSHandler()
+    handler.save(path, pipeline)
+    loaded = Pipeline()
+    handler.load(path, loaded)
+
+    # the same structures added one by one
+    added = Pipeline()
+    arrays, metadata = handler.read(path)
+    structures, points = handler.decode(arrays, metadata, added.coordinates)
+    added.add_structures(structures, orders=arrays["orders"].tolist())
+    assert indexes(loaded) == indexes(added)
@@ -0,0 +1,94 @@
+from hashlib import md5
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from opps.io.conversion import load_pipeline
+from opps.io.pcf.pcf_exporter import PCFExporter
+from opps.model import Bend, Elbow, Flange, Pipe, Pipeline, Point
+
+EXAMPLES = Path(__file__).parents[1] / "data" / "example_files" / "pcf"
+
+# The files written by the exporter before it was streamed
+EXPORTED = {
+    "teste.pcf": "ad1d0b1129749f6819bfc4b71b8308e1",
+    "teste2.pcf": "7d0235948eb8142f14e333ba637e9b92",
+}
+
+
+@pytest.mark.parametrize("name", sorted(EXPORTED))
+def test_example_files_are_exported_as_before(name):
+    text = PCFExporter().encoder(load_pipeline(EXAMPLES / name))
+    assert md5(text.encode()).hexdigest() == EXPORTED[name]
+
+
+def reference_record(structure):
+    # How every structure was encoded by itself, with python's round
+    mm = [round(1000 * x) for point in structure.get_points() for x in point]
+    diameters = [round(1000 * d) for d in structure.get_diameters()]
+
+    if isinstance(structure, Pipe):
+        return (
+            f"PIPE\n    END-POINT{mm[0]:>14.4f}{mm[1]:>13.4f}{mm[2]:>13.4f}{diameters[0]:>15.4f}  "
+            f"\n    END-POINT{mm[3]:>14.4f}{mm[4]:>13.4f}{mm[5]:>13.4f}{diameters[1]:>15.4f}"
+        )
+
+    if isinstance(structure, Flange):
+        end = [round(x + n, 2) for x, n in zip(structure.position, structure.normal)]
+        return (
+            f"FLANGE\n    END-POINT{mm[0]:>14.4f}{mm[1]:>13.4f}{mm[2]:>13.4f}{diameters[0]:>15.4f}   "
+            f"\n    END-POINT{1000*end[0]:>14.4f}{1000*end[1]:>13.4f}{1000*end[2]:>13.4f}"
+            f"{diameters[0]:>15.4f}   \n    SKEY FLBL"
+        )
+
+    if structure.is_colapsed():
+        return None
+
+    if isinstance(structure, Elbow):
+        return (
+            f"ELBOW\n    END-POINT{mm[0]:>14.4f}{mm[1]:>11.4f}{mm[2]:>13.4f}{diameters[0]:>13.4f}   "
+            f"\n    END-POINT{mm[3]:>14.4f}{mm[4]:>11.4f}{mm[5]:>13.4f}{diameters[1]:>13.4f}   "
+            f"\n    CENTRE-POINT{mm[6]:>14.4f}{mm[7]:>11.4f}{mm[8]:>13.4f}        "
+            "\n    SKEY                 ELBW"
+        )
+
+    return (
+        f"BEND\n    END-POINT{mm[0]:>17.4f}{mm[1]:>13.4f}{mm[2]:>13.4f}{diameters[0]:>15.4f}  "
+        f"\n    END-POINT{mm[3]:>17.4f}{mm[4]:>13.4f}{mm[5]:>13.4f}{diameters[1]:>15.4f}   "
+        f"\n    CENTRE-POINT{mm[6]:>14.4f}{mm[7]:>13.4f}{mm[8]:>13.4f}   \n    SKEY BEBW"
+    )
+
+
+def test_same_as_encoding_one_by_one():
+    # Coordinates with many halves, that round differently with
+    # numpy and python, and negative zeros.
+    rng = np.random.default_rng(4)
+    pipeline = Pipeline()
+
+    def point():
+        coords = rng.integers(-2000, 2000, 3) / 1000 + rng.choice([0, 5e-4, -5e-4, 5e-3], 3)
+        return Point(*coords, store=pipeline.coordinates)
+
+    structures = []
+    for _ in range(3000):
+        kind = rng.integers(5)
+        if kind == 0:
+            structures.append(Pipe(point(), point(), *rng.uniform(0, 1, 2)))
+        elif kind == 1:
+            structures.append(Flange(point(), point().coords().copy(), rng.uniform(0, 1)))
+        elif kind == 2:
+            structures.append(Bend(point(), point(), point(), 0.3, *rng.uniform(0, 1, 2)))
+        elif kind == 3:
+            structures.append(Elbow(point(), point(), point(), 0.3, *rng.uniform(0, 1, 2)))
+        else:
+            corner = point()
+            structures.append(Bend(Point(*corner, store=pipeline.coordinates), corner, corner, 0.3))
+    structures.append(Pipe(Point(-1e-4, 0, 0, store=pipeline.coordinates), point()))
+    pipeline.add_structures(structures)
+
+    records = [reference_record(structure) for structure in pipeline.structures]
+    expected = PCFExporter().encoder_header(pipeline) + "".join(
+        "\n" + record for record in records if record is not None
+    )
+    assert PCFExporter().encoder(pipeline) == expected
@@ -0,0 +1,69 @@
+import pytest
+
+from opps.io.pcf.pcf_handler import PCFHandler
+from opps.model import Bend, Flange, Pipe, Pipeline
+
+PIPE = "PIPE\n    END-POINT 0 0 0 100\n    END-POINT 1000 0 0 100\n"
+BEND = (
+    "BEND\n    END-POINT 1000 0 0 100\n    END-POINT 1300 300 0 100\n"
+    "    CENTRE-POINT 1300 0 0\n    SKEY BEBW\n"
+)
+FLANGE = "FLANGE\n    END-POINT 1300 300 0 100\n    END-POINT 1300 400 0 100\n"
+
+
+def load(tmp_path, text):
+    path = tmp_path / "pipeline.pcf"
+    path.write_text(text, encoding="iso_8859_1")
+    pipeline = Pipeline()
+    PCFHandler().load(path, pipeline)
+    return pipeline
+
+
+def test_components(tmp_path):
+    pipeline = load(tmp_path, "ISOGEN-FILES ISOGEN.FLS\n" + PIPE + BEND + FLANGE)
+    pipe, bend, flange = pipeline.structures
+    assert (type(pipe), type(bend), type(flange)) == (Pipe, Bend, Flange)
+    assert pipe.end.coords().tolist() == [1, 0, 0]
+    assert bend.corner.coords().tolist() == [1.3, 0, 0]
+    assert bend.curvature == pytest.approx(0.3)
+    assert flange.normal.tolist() == pytest.approx([0, -0.1, 0])
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        (PIPE.replace("1000 0 0 100", "1000 0 0"), 'PIPE line "END-POINT 1000 0 0"'),
+        (PIPE.replace("0 0 0 100", "0 0 0 100 7"), 'PIPE line "END-POINT 0 0 0 100 7"'),
+        (BEND.replace("1300 0 0\n", "1300 0\n"), 'BEND line "CENTRE-POINT 1300 0"'),
+        ("FLANGE\n    END-POINT 0 0 0 100\n", "FLANGE is missing line 2"),
+    ],
+)
+def test_malformed_lines(tmp_path, text, message):
+    with pytest.raises(ValueError, match=message):
+        load(tmp_path, text)
+
+
+def test_components_are_read_lazily():
+    read = []
+
+    def lines():
+        for line in (PIPE + BEND + FLANGE).splitlines(keepends=True):
+            read.append(line)
+            yield line
+        raise AssertionError("read past the end")
+
+    groups = PCFHandler().group_structures(lines())
+    assert next(groups) == PIPE.splitlines(keepends=True)
+    # only the header of the next component was read
+    assert len(read) == 4
+    assert next(groups)[0] == "BEND\n"
+
+
+def test_components_are_decoded_in_chunks():
+    handler = PCFHandler()
+    groups = handler.group_structures((PIPE + BEND + FLANGE + PIPE).splitlines(keepends=True))
+    store = Pipeline().coordinates
+    structures = list(handler.create_classes(groups, store, chunk_size=3))
+
+    assert [type(structure) for structure in structures] == [Pipe, Bend, Flange, Pipe]
+    assert all(structure.get_points()[0].store is store for structure in structures)
@@ -0,0 +1,65 @@
+from opps.model import Flange, Pipe, Pipeline, Point
+
+
+def chain_of_pipes(pipeline, n):
+    points = [Point(i, 0, 0, store=pipeline.coordinates) for i in range(n + 1)]
+    return points, [Pipe(a, b) for a, b in zip(points, points[1:])]
+
+
+def test_incidence_follows_the_structures():
+    pipeline = Pipeline()
+    points, pipes = chain_of_pipes(pipeline, 3)
+    pipeline.add_structures(pipes)
+
+    assert pipeline.connected_structures(points[0]) == [pipes[0]]
+    assert pipeline.connected_structures(points[1]) == pipes[:2]
+    assert pipeline._connected_points(points[1]) == [points[0], points[2]]
+
+    pipeline.remove_structure(pipes[1])
+    assert pipeline.connected_structures(points[1]) == [pipes[0]]
+    assert pipeline.connected_structures(points[2]) == [pipes[2]]
+
+    pipeline.remove_structure(pipes[0])
+    assert not pipeline.connected_structures(points[0])
+    assert not pipeline.has_point(points[0])
+
+
+def test_incidence_follows_replaced_points():
+    pipeline = Pipeline()
+    points, pipes = chain_of_pipes(pipeline, 2)
+    flange = Flange(points[2], (1, 0, 0))
+    pipeline.add_structures(pipes + [flange])
+
+    new = Point(2, 0, 0)
+    pipeline.replace_point(points[2], new)
+    assert flange.position is new and pipes[1].end is new
+    assert pipeline.connected_structures(new) == [pipes[1], flange]
+    assert not pipeline.connected_structures(points[2])
+
+
+def test_tags_are_stable():
+    pipeline = Pipeline()
+    points, pipes = chain_of_pipes(pipeline, 3)
+    pipeline.add_structures(pipes)
+    tags = [pipe.tag for pipe in pipes]
+    assert len(set(tags)) == 3
+    assert all(pipeline.get_structure(pipe.tag) is pipe for pipe in pipes)
+
+    assert pipeline.remove_structure(pipes[1]) is pipes[1]
+    assert pipeline.remove_structure(pipes[1]) is None
+    assert pipeline.get_structure(tags[1]) is None
+    assert [pipe.tag for pipe in pipeline.structures] == [tags[0], tags[2]]
+
+    # a restored structure gets its tag back, and a new one gets another
+    pipeline.add_structure(pipes[1])
+    assert pipeline.get_structure(tags[1]) is pipes[1]
+    pipe = Pipe(points[3], Point(4, 0, 0))
+    pipeline.add_structure(pipe)
+    assert pipe.tag not in tags
+
+    # a structure can't take the tag of another one
+    copy = Pipe(points[0], points[1])
+    copy.tag = tags[0]
+    pipeline.add_structure(copy)
+    assert copy.tag != tags[0]
+    assert pipeline.get_structure(tags[0]) is pipes[0]
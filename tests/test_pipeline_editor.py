@@ -0,0 +1,197 @@
+from itertools import pairwise
+
+import numpy as np
+import pytest
+
+from opps.model import Bend, Flange, Pipe, Pipeline, Point
+from opps.model.pipeline_editor import PipelineEditor
+
+
+def test_undo_with_only_flanges_left():
+    editor = PipelineEditor(Pipeline())
+    editor.add_bent_pipe((1, 0, 0))
+    editor.add_flange()
+    editor.commit()
+
+    pipe = next(s for s in editor.pipeline.structures if isinstance(s, Pipe))
+    flange = next(s for s in editor.pipeline.structures if isinstance(s, Flange))
+    editor.set_anchor(pipe.start)
+
+    editor.select_structures([pipe])
+    editor.delete_selection()
+    assert editor.pipeline.number_of_points() == 1
+    assert not len(editor.pipeline.control_point_rows())
+
+    editor.select_structures([flange])
+    editor.delete_selection()
+
+    # the flange comes back, and its point is the only one left
+    editor.undo()
+    assert editor.anchor is flange.position
+
+    editor.redo()
+    assert editor.anchor is editor.pipeline.origin
+
+
+def test_anchor_falls_back_to_the_newest_control_point():
+    pipeline = Pipeline()
+    # the newest pipe gets the lowest rows of the store
+    newest = Pipe(
+        Point(0, 5, 0, store=pipeline.coordinates), Point(1, 5, 0, store=pipeline.coordinates)
+    )
+    oldest = Pipe(
+        Point(0, 0, 0, store=pipeline.coordinates), Point(1, 0, 0, store=pipeline.coordinates)
+    )
+    pipeline.add_structure(oldest)
+    pipeline.add_structure(newest)
+    editor = PipelineEditor(pipeline)
+
+    editor.set_anchor(newest.end)
+    editor.add_pipe((1, 0, 0))
+    editor.commit()
+    added = next(s for s in pipeline.structures if s not in (oldest, newest))
+
+    editor.select_structures([added])
+    editor.delete_selection()
+    assert editor.anchor is newest.end
+
+
+def separate_pipes(pipeline, n):
+    # a straight chain of pipes that don't share their points
+    return [
+        Pipe(
+            Point(i, 0, 0, store=pipeline.coordinates),
+            Point(i + 1, 0, 0, store=pipeline.coordinates),
+        )
+        for i in range(n)
+    ]
+
+
+def test_merge_coincident_points_is_undone_at_once():
+    pipeline = Pipeline()
+    pipes = separate_pipes(pipeline, 10)
+    flange = Flange(Point(10, 0, 0, store=pipeline.coordinates), np.array([1, 0, 0]))
+    pipeline.add_structures(pipes + [flange])
+    editor = PipelineEditor(pipeline)
+    before = [structure.get_points() for structure in pipeline.structures]
+
+    replaced = editor.merge_coincident_points()
+    editor.history.close_group()
+    assert len(replaced) == 10
+    assert pipeline.number_of_points() == 11
+    assert flange.position is pipes[-1].end
+    assert all(a.end is b.start for a, b in pairwise(pipes))
+    assert len(pipeline.control_point_rows()) == 11
+    after = [structure.get_points() for structure in pipeline.structures]
+
+    editor.undo()
+    assert pipeline.number_of_points() == 21
+    assert [structure.get_points() for structure in pipeline.structures] == before
+    assert all(pipeline.connected_structures(p) == [s] for s in pipes for p in s.get_points())
+
+    editor.redo()
+    assert pipeline.number_of_points() == 11
+    assert [structure.get_points() for structure in pipeline.structures] == after
+
+
+def test_large_merge_fits_in_the_history():
+    pipeline = Pipeline()
+    pipeline.add_structures(separate_pipes(pipeline, 100_000))
+    editor = PipelineEditor(pipeline)
+
+    editor.merge_coincident_points()
+    editor.history.close_group()
+    assert editor.history.memory <= editor.history.memory_budget
+    assert editor.history.can_undo()
+
+    editor.undo()
+    assert pipeline.number_of_points() == 200_000
+
+
+def test_merge_keeps_the_points_of_a_collapsed_bend():
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    editor.add_bent_pipe((1, 0, 0))
+    editor.commit()
+    editor.add_bent_pipe((1, 0, 0))
+    editor.commit()
+
+    # a loose pipe going on from the end of the route
+    start = Point(2, 0, 0, store=pipeline.coordinates)
+    loose = Pipe(start, Point(3, 0, 0, store=pipeline.coordinates))
+    pipeline.add_structure(loose)
+    (bend,) = [structure for structure in pipeline.structures if isinstance(structure, Bend)]
+
+    assert list(editor.merge_coincident_points()) == [start]
+    assert bend.start is not bend.corner and bend.end is not bend.corner
+
+    editor.set_point_coords(bend.corner, (1, 1, 0))
+    editor.update()
+    assert not np.allclose(bend.start.coords(), bend.end.coords())
+
+
+def count_updates(pipeline):
+    calls = []
+    update_curvatures = pipeline._update_curvatures
+
+    def counted(structures=None):
+        calls.append(structures is None)
+        return update_curvatures(structures)
+
+    pipeline._update_curvatures = counted
+    return calls
+
+
+def test_batch_updates_once():
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    calls = count_updates(pipeline)
+
+    with editor.batch():
+        editor.add_bent_pipe((1, 0, 0))
+        with editor.batch():
+            editor.add_bent_pipe((0, 1, 0))
+            editor.add_route([(1, 1, 0), (1, 1, 1), (2, 1, 1)])
+        assert not calls
+    assert len(calls) == 1
+
+    bend = next(structure for structure in pipeline.structures if isinstance(structure, Bend))
+    assert not np.allclose(bend.start.coords(), bend.corner.coords())
+
+
+def test_failed_batch_raises_its_own_error():
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    calls = count_updates(pipeline)
+
+    class Failure(Exception):
+        pass
+
+    with pytest.raises(Failure):
+        with editor.batch():
+            editor.add_bent_pipe((1, 0, 0))
+            raise Failure()
+    assert not calls
+
+    # what was done before the error is solved by the next update
+    editor.update()
+    assert calls == [True]
+
+
+def test_points_are_told_apart_by_identity():
+    pipeline = Pipeline()
+    pipes = separate_pipes(pipeline, 3)
+    pipeline.add_structures(pipes)
+    editor = PipelineEditor(pipeline)
+
+    # two flanges on the same place, one for each point there
+    editor.set_anchor(pipes[0].end)
+    flange = editor.add_flange()
+    editor.set_anchor(pipes[1].start)
+    assert editor.add_flange() is not flange
+    editor.set_anchor(pipes[0].end)
+    assert editor.add_flange() is flange
+
+    editor.remove_point(pipes[0].end, rejoin=False)
+    assert list(pipeline.structures)[:2] == pipes[1:]
+    assert flange not in pipeline.structures
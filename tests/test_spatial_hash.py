@@ -0,0 +1,33 @@
+import numpy as np
+
+from opps.model.spatial_hash import find_coincident_points
+
+
+def brute_force_labels(coords, tolerance):
+    close = np.linalg.norm(coords[:, None] - coords[None], axis=2) <= tolerance
+    labels = np.arange(len(coords))
+    while True:
+        new_labels = np.array([labels[row].min() for row in close])
+        if (new_labels == labels).all():
+            return labels
+        labels = new_labels
+
+
+def test_same_groups_as_brute_force():
+    rng = np.random.default_rng(0)
+    for tolerance in (0.05, 0.3, 1.0):
+        coords = rng.integers(-5, 5, (300, 3)) * 0.7 + rng.normal(0, 0.3, (300, 3))
+        labels = find_coincident_points(coords, tolerance)
+        assert (labels == brute_force_labels(coords, tolerance)).all()
+
+
+def test_points_across_cell_borders_of_a_lattice():
+    # Every pair is split by a cell border, in so many cells
+    # that a hash of them would have collisions.
+    n = 60
+    lattice = np.stack(np.meshgrid(*[np.arange(n)] * 3, indexing="ij"), -1).reshape(-1, 3) * 3.0
+    coords = np.concatenate((lattice - 1e-4, lattice + 1e-4))
+
+    labels = find_coincident_points(coords, 1.0)
+    assert (labels[: len(lattice)] == np.arange(len(lattice))).all()
+    assert (labels[len(lattice) :] == np.arange(len(lattice))).all()
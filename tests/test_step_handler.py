@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+gmsh = pytest.importorskip("gmsh")
+
+from opps.io.cad_file.gmsh_session import gmsh_model
+from opps.io.cad_file.step_handler import StepHandler
+from opps.model import Bend, Pipe, Pipeline
+from opps.model.pipeline_editor import PipelineEditor
+
+
+def test_step_round_trip(tmp_path):
+    path = tmp_path / "pipeline.step"
+    editor = PipelineEditor(Pipeline())
+    editor.add_route([(0, 0, 0), (1, 0, 0), (1, 1, 0), (1, 1, 1)], bend_radius=0.2)
+    editor.commit()
+    editor.update()
+    StepHandler().save(path, editor)
+    bends = [s for s in editor.pipeline.structures if isinstance(s, Bend)]
+
+    loaded = PipelineEditor(Pipeline())
+    StepHandler().open(path, loaded)
+    loaded_bends = [s for s in loaded.pipeline.structures if isinstance(s, Bend)]
+    pipes = [s for s in loaded.pipeline.structures if isinstance(s, Pipe)]
+    assert len(pipes) == 3 and len(loaded_bends) == 2
+    # the lines are connected again
+    assert loaded.pipeline.number_of_points() == editor.pipeline.number_of_points()
+
+    # the centers written in the file are used as they are
+    centers = sorted(tuple(bend.center.coords().round(9)) for bend in bends)
+    loaded_centers = sorted(tuple(bend.center.coords().round(9)) for bend in loaded_bends)
+    assert np.allclose(loaded_centers, centers, rtol=0, atol=1e-9)
+    assert [bend.curvature for bend in loaded_bends] == pytest.approx([0.2, 0.2])
+
+
+def test_arc_centers_snap_to_the_center_points():
+    with gmsh_model() as model:
+        start = model.occ.add_point(1, 0, 0)
+        center = model.occ.add_point(0, 0, 0)
+        end = model.occ.add_point(0, 1, 0)
+        arc = model.occ.add_circle_arc(start, center, end)
+        model.occ.synchronize()
+
+        (computed,) = StepHandler()._arc_centers([arc], np.zeros((0, 3)))
+        assert np.allclose(computed, (0, 0, 0), rtol=0, atol=1e-9)
+
+        # a center point of the file close enough is taken as it is
+        center_points = np.array([[5, 5, 5], [1e-8, 0, 0]])
+        (snapped,) = StepHandler()._arc_centers([arc], center_points, tolerance=1e-6)
+        assert snapped.tolist() == [1e-8, 0, 0]
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from opps.io.conversion import load_pipeline
+from opps.model import Bend, Flange, Pipe, Pipeline, Point
+from opps.model.pipeline_editor import PipelineEditor
+
+EXAMPLES = Path(__file__).parents[1] / "data" / "example_files" / "pcf"
+
+
+@pytest.mark.parametrize("path", sorted(EXAMPLES.glob("*.pcf")), ids=lambda path: path.name)
+def test_example_files_have_no_errors(path):
+    report = load_pipeline(path).validate()
+    assert report.errors == []
+
+
+def test_flange_connected_by_its_far_end():
+    # pcf flanges are placed at their first end point, facing away from the pipe
+    pipeline = Pipeline()
+    start = Point(0, 0, 0, store=pipeline.coordinates)
+    end = Point(1, 0, 0, store=pipeline.coordinates)
+    face = Point(-0.1, 0, 0, store=pipeline.coordinates)
+    pipeline.add_structures([Pipe(start, end), Flange(face, np.array([-0.1, 0, 0]))])
+
+    counts = pipeline.validate().count()
+    assert "misplaced_flange" not in counts
+    assert counts["open_end"] == 1
+
+
+def test_diameter_mismatch_lists_the_structures():
+    pipeline = Pipeline()
+    points = [Point(i, 0, 0, store=pipeline.coordinates) for i in range(3)]
+    first = Pipe(points[0], points[1], 0.1, 0.1)
+    second = Pipe(points[1], points[2], 0.2, 0.2)
+    pipeline.add_structures([first, second])
+
+    (issue,) = [issue for issue in pipeline.validate().issues if issue.check == "diameter_mismatch"]
+    assert sorted(issue.structures) == sorted((first.tag, second.tag))
+    assert issue.position == (1, 0, 0)
+
+
+def route(points, bend_radius=0.3):
+    pipeline = Pipeline()
+    editor = PipelineEditor(pipeline)
+    editor.add_route(points, bend_radius=bend_radius)
+    editor.commit()
+    return pipeline, editor
+
+
+def test_a_clean_route_only_has_its_open_ends():
+    pipeline, _ = route([(0, 0, 0), (2, 0, 0), (2, 2, 0), (2, 2, 2)])
+    report = pipeline.validate()
+    assert report.is_valid()
+    assert report.count() == {"open_end": 2}
+
+
+def test_zero_length_pipe():
+    pipeline = Pipeline()
+    pipe = Pipe(
+        Point(1, 1, 1, store=pipeline.coordinates), Point(1, 1, 1, store=pipeline.coordinates)
+    )
+    pipeline.add_structure(pipe)
+
+    (issue,) = [issue for issue in pipeline.validate().errors]
+    assert (issue.check, issue.structures, issue.position) == (
+        "zero_length_pipe",
+        (pipe.tag,),
+        (1, 1, 1),
+    )
+
+
+def test_bend_that_does_not_fit():
+    # the corners are closer than the two curves need
+    pipeline, _ = route([(0, 0, 0), (2, 0, 0), (2, 0.4, 0), (4, 0.4, 0)])
+    (issue,) = pipeline.validate().errors
+    assert issue.check == "bend_does_not_fit"
+
+    bends = [structure for structure in pipeline.structures if isinstance(structure, Bend)]
+    pipes = [structure for structure in pipeline.structures if isinstance(structure, Pipe)]
+    assert sorted(issue.structures) == sorted((pipes[1].tag, bends[0].tag, bends[1].tag))
+    assert pipeline.validate().count()["collapsed_bend"] == 1
+
+
+def test_loose_flange():
+    pipeline = Pipeline()
+    pipeline.add_structure(Flange(Point(0, 0, 0, store=pipeline.coordinates), np.array([1, 0, 0])))
+    report = pipeline.validate()
+    assert report.is_valid()
+    assert report.count() == {"misplaced_flange": 1}